@@ -0,0 +1,64 @@
+"""Mede a vazão (linhas/s) da importação e da exportação em massa.
+
+Exemplo, dentro do diretório ./CODIGO:
+
+    python -m benchmarks.bulk_bench --rows 200000 --users 1000
+"""
+import os
+import json
+import time
+import logging
+import argparse
+import tempfile
+
+import bulk
+import database
+from cache import user_index
+from migrations import migrate
+
+def write_sample(path, rows, users, fmt):
+    text = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4
+    records = ({'username': f"usuario{i % users}", 'title': f"Entrada {i}", 'content': text, 'occupation': 'dev',
+                'week_details': text, 'hobbies': 'xadrez', 'hometown': 'Campo Grande', 'weekend_plans': text} for i in range(rows))
+    with open(path, 'w', encoding='utf-8', newline='') as output:
+        if fmt == 'ndjson':
+            for record in records:
+                output.write(json.dumps(record, ensure_ascii=False) + '\n')
+        else:
+            fields = ('username', *bulk.ENTRY_FIELDS)
+            output.write(bulk.render_rows([fields], 'csv'))
+            for record in records:
+                output.write(bulk.render_rows([[record[field] for field in fields]], 'csv'))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--chunk-size', type=int, default=bulk.BULK_CHUNK_SIZE)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in bulk.FORMATS:
+            database.configure(path=os.path.join(tmp, f'{fmt}.db'))
+            with database.connection() as conn:
+                migrate(conn)
+            sample = os.path.join(tmp, f'amostra.{fmt}')
+            write_sample(sample, args.rows, args.users, fmt)
+
+            started = time.perf_counter()
+            with open(sample, 'rb') as fileobj:
+                text = bulk.io.TextIOWrapper(fileobj, encoding='utf-8', newline='')
+                imported, _ = bulk.import_records(bulk.parse(text, fmt), chunk_size=args.chunk_size)
+            elapsed = time.perf_counter() - started
+            print(f"importação {fmt:<6} {imported:>9} linhas  {elapsed:7.2f} s  {imported / elapsed:10.0f} linhas/s")
+
+            started = time.perf_counter()
+            exported = sum(chunk.count('\n') for chunk in bulk.export_batches(fmt=fmt)) - (1 if fmt == 'csv' else 0)
+            elapsed = time.perf_counter() - started
+            print(f"exportação {fmt:<6} {exported:>9} linhas  {elapsed:7.2f} s  {exported / elapsed:10.0f} linhas/s")
+            database.close_pool()
+            user_index.clear()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Teste de carga das rotas de leitura contra um servidor uvicorn local.
+
+Exemplo, dentro do diretório ./CODIGO:
+
+    python -m benchmarks.load_test --entries 5000 --concurrency 1 16 64 --no-cache
+
+Cada nível de concorrência abre N conexões keep-alive que repetem as rotas
+escolhidas durante `--duration` segundos; o relatório traz requisições por
+segundo e latências p50/p95. `--app-dir` permite rodar o mesmo teste contra
+outra cópia do código (por exemplo um checkout anterior) para comparar.
+
+Para ver como a vazão escala com o número de núcleos, `--workers 1 2 4`
+repete o teste com cada número de processos e mostra o ganho sobre o primeiro:
+
+    python -m benchmarks.load_test --workers 1 2 4 --concurrency 64
+"""
+import os
+import sys
+import time
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from urllib.request import urlopen
+from statistics import quantiles
+
+from benchmarks.seed import seed
+from benchmarks.client import HttpClient
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(app_dir, db_path, port, no_cache, workers=1):
+    env = dict(os.environ, DATABASE_PATH=db_path)
+    if no_cache:
+        env['CACHE_TTL'] = '0'
+    # server.py (quando existe na cópia testada) migra uma vez e sobe os workers como em produção.
+    command = [sys.executable, 'server.py'] if os.path.exists(os.path.join(app_dir, 'server.py')) else [sys.executable, '-m', 'uvicorn', 'main:app']
+    server = subprocess.Popen(
+        command + ['--host', '127.0.0.1', '--port', str(port), '--workers', str(workers), '--log-level', 'warning', '--no-access-log'],
+        cwd=app_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    # A porta abre antes de os workers terminarem de subir; espera uma resposta de verdade.
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urlopen(f'http://127.0.0.1:{port}/', timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("O servidor não respondeu a tempo")
+
+async def run_level(port, paths, concurrency, duration):
+    latencies = []
+    errors = 0
+    stop_at = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        client = HttpClient('127.0.0.1', port)
+        try:
+            while time.perf_counter() < stop_at:
+                path = random.choice(paths)
+                started = time.perf_counter()
+                try:
+                    status, _, _ = await client.request('GET', path)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    errors += 1
+                    await client.close()
+                    continue
+                if status >= 400:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+        finally:
+            await client.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+def report(workers, concurrency, latencies, errors, elapsed, reference=None):
+    if len(latencies) < 2:
+        print(f"workers={workers:<3} c={concurrency:<4} sem amostras suficientes")
+        return None
+    rps = len(latencies) / elapsed
+    cuts = quantiles(latencies, n=100)
+    scaling = f"   {rps / reference:5.2f}x" if reference else ''
+    print(f"workers={workers:<3} c={concurrency:<4} {rps:9.1f} req/s   p50={cuts[49] * 1000:7.2f} ms   "
+          f"p95={cuts[94] * 1000:7.2f} ms   erros={errors}{scaling}")
+    return rps
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--app-dir', default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--entries', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--paths', nargs='+', default=['/view_entry/{entry}', '/view_entries/{user}', '/all_entries'])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1],
+                        help="números de processos a comparar, por exemplo 1 2 4; a vazão é comparada com o primeiro")
+    parser.add_argument('--no-cache', action='store_true', help="desativa o cache de páginas para medir o caminho até o banco")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'DATABASE.db')
+        seed(db_path, args.users, args.entries)
+        paths = [path.format(entry=random.randint(1, args.entries), user=random.randint(1, args.users))
+                 for path in args.paths for _ in range(20)]
+        baseline = {}
+        for workers in args.workers:
+            port = free_port()
+            server = start_server(args.app_dir, db_path, port, args.no_cache, workers)
+            try:
+                for concurrency in args.concurrency:
+                    rps = report(workers, concurrency, *asyncio.run(run_level(port, paths, concurrency, args.duration)),
+                                 reference=baseline.get(concurrency))
+                    baseline.setdefault(concurrency, rps)
+            finally:
+                server.terminate()
+                server.wait()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Micro-benchmark do custo de renderização por linha: árvore FT por linha x template compilado.
+
+Exemplo, dentro do diretório ./CODIGO:
+
+    python -m benchmarks.render_bench --rows 2000
+"""
+import argparse
+from timeit import repeat
+
+from fasthtml.common import *
+from render import ENTRY_CARD, ENTRY_LINK
+from storage import excerpt
+
+BUTTON_STYLE = 'display: inline-block; padding: 10px 20px; margin: 10px; background-color: #007bff; color: white; text-align: center; text-decoration: none; border-radius: 5px; font-size: 16px; font-weight: bold; cursor: pointer; transition: background-color 0.3s ease;'
+
+# Cópias das versões anteriores de entry_div e dos links de /all_entries, usadas como referência.
+def ft_entry_div(entry_id, title, content, occupation, week_details, hobbies, hometown, weekend_plans, timestamp):
+    return Div(
+        H3(title),
+        P(f"ESTÓRIA: {content}"),
+        P(f"OCUPAÇÃO: {occupation}"),
+        P(f"DETALHES DA SEMANA: {week_details}"),
+        P(f"HÁBITOS: {hobbies}"),
+        P(f"CIDADE NATAL: {hometown}"),
+        P(f"PLANOS DE FIM DE SEMANA: {weekend_plans}"),
+        P(f"POSTADO EM: {timestamp}"),
+        Div(
+            A("EDITAR", href=f'/edit/{entry_id}', style=BUTTON_STYLE),
+            A("APAGAR", href=f'/del/{entry_id}', style=BUTTON_STYLE.replace('#007bff', '#dc3545')),
+            style="display: flex; justify-content: start; gap: 10px; margin-top: 10px;"
+        ),
+        id=f'entry-{entry_id}'
+    )
+
+def ft_entry_link(entry_id, title, username):
+    return Div(A(f"{title} COM USUÁRIO: {username}", href=f'/view_entry/{entry_id}', style=BUTTON_STYLE.replace('#007bff', 'red')))
+
+def rows(count):
+    text = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4
+    return [(i, f"Entrada {i} & <cia>", text, 'dev', text, 'xadrez', 'Campo Grande', text, '2024-01-01 12:00:00') for i in range(count)]
+
+def measure(label, render, count, number):
+    best = min(repeat(render, number=number, repeat=5))
+    per_row = best / number / count * 1e6
+    print(f"{label:<28} {per_row:8.2f} µs/linha   {len(render()) / count:8.0f} bytes/linha")
+    return per_row
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--number', type=int, default=3)
+    args = parser.parse_args()
+    data = rows(args.rows)
+
+    before = measure("entry_div (árvore FT)", lambda: ''.join(to_xml(ft_entry_div(*row)) for row in data), args.rows, args.number)
+    # O cartão atual mostra só o resumo; o tamanho em bytes/linha inclui essa diferença.
+    summaries = [(row[0], row[1], excerpt(row[2]), row[3], row[6], row[8]) for row in data]
+    after = measure("entry_div (template)", lambda: ''.join(ENTRY_CARD(entry_id=row[0], title=row[1], excerpt=row[2], occupation=row[3], hometown=row[4], timestamp=row[5]) for row in summaries), args.rows, args.number)
+    print(f"{'':<28} {before / after:8.1f}x mais rápido")
+
+    before = measure("link /all_entries (FT)", lambda: ''.join(to_xml(ft_entry_link(row[0], row[1], 'usuario')) for row in data), args.rows, args.number)
+    after = measure("link /all_entries (template)", lambda: ''.join(ENTRY_LINK(entry_id=row[0], title=row[1], username='usuario') for row in data), args.rows, args.number)
+    print(f"{'':<28} {before / after:8.1f}x mais rápido")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Popula um banco com dados sintéticos para os benchmarks.
+
+Exemplo, dentro do diretório ./CODIGO:
+
+    python -m benchmarks.seed --users 100 --entries 10000 -o DATABASE.db
+
+Os textos têm tamanhos variados (títulos curtos, histórias de algumas
+centenas a alguns milhares de caracteres) e são gerados a partir de uma
+semente fixa: a mesma linha de comando produz sempre o mesmo banco.
+"""
+import random
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+import bulk
+import database
+from cache import user_index
+from migrations import migrate
+
+WORDS = (
+    "semana trabalho casa cidade amigos família projeto reunião viagem café livro música treino jantar "
+    "escola cliente equipe código banco praia chuva sol domingo sábado feira mercado filme série parque "
+    "cachorro gato bicicleta corrida cozinha receita festa aniversário estudo prova curso ideia plano "
+    "manhã tarde noite ontem hoje amanhã sempre nunca muito pouco novo velho grande pequeno bom difícil"
+).split()
+OCCUPATIONS = ("desenvolvedor", "professora", "engenheiro", "designer", "médica", "estudante", "vendedor", "analista")
+HOMETOWNS = ("Campo Grande", "São Paulo", "Recife", "Curitiba", "Manaus", "Porto Alegre", "Salvador", "Belém")
+START = datetime(2024, 1, 1)
+
+def sentence(rng, min_chars, max_chars):
+    # Tamanho sorteado com viés para textos curtos, como acontece em entradas reais.
+    size = int(min_chars + (max_chars - min_chars) * rng.random() ** 2)
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words).capitalize() + '.'
+
+def entry_fields(rng):
+    return {
+        'title': sentence(rng, 15, 80),
+        'content': sentence(rng, 200, 4000),
+        'occupation': rng.choice(OCCUPATIONS),
+        'week_details': sentence(rng, 50, 800),
+        'hobbies': sentence(rng, 10, 120),
+        'hometown': rng.choice(HOMETOWNS),
+        'weekend_plans': sentence(rng, 30, 400),
+    }
+
+def synthetic_records(users, entries, seed=0):
+    rng = random.Random(seed)
+    for i in range(entries):
+        yield {
+            'username': f"usuario{rng.randrange(users)}",
+            'timestamp': (START + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"),
+            **entry_fields(rng),
+        }
+
+def seed(path, users, entries, rng_seed=0):
+    """Cria `path` com o esquema atual e `entries` entradas distribuídas entre `users` usuários.
+
+    As entradas recebem os ids 1..entries, em ordem cronológica.
+    """
+    database.configure(path=path)
+    try:
+        with database.connection() as conn:
+            migrate(conn)
+            conn.executemany("INSERT INTO users (username) VALUES (?) ON CONFLICT (username) DO NOTHING",
+                             [(f"usuario{i}",) for i in range(users)])
+            conn.commit()
+        user_index.clear()
+        return bulk.import_records(synthetic_records(users, entries, rng_seed))[0]
+    finally:
+        database.close_pool()
+        user_index.clear()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--entries', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', default='DATABASE.db')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    count = seed(args.output, args.users, args.entries, args.seed)
+    print(f"{args.output}: {args.users} usuários, {count} entradas")
+
+if __name__ == '__main__':
+    main()
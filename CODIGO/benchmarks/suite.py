@@ -0,0 +1,260 @@
+"""Benchmark de todas as rotas, pelo TestClient do Starlette e por um uvicorn local.
+
+Exemplo, dentro do diretório ./CODIGO:
+
+    python -m benchmarks.suite --entries 10000 --concurrency 1 8 32 -o resultados.json
+    python -m benchmarks.suite --entries 10000 --concurrency 1 8 32 --baseline resultados.json
+
+Para cada cliente (`testclient`, dentro do próprio processo, e `uvicorn`, por
+HTTP), cada rota e cada nível de concorrência, N clientes repetem a rota
+durante `--duration` segundos. O relatório traz requisições por segundo e as
+latências p50/p95/p99; `-o` grava tudo em JSON e `--baseline` compara com um
+JSON gravado antes (por exemplo no commit anterior). `--app-dir` vale só para
+o uvicorn; o `testclient` usa o código deste diretório.
+
+`patch` envia um único campo por PATCH para /update e `hx_delete` usa o
+DELETE de /del, como o htmx faz. Cada cliente recebe uma cópia nova do banco
+semeado, e as exclusões rodam por último: `del` apaga em ordem a primeira
+metade das entradas e `hx_delete` a segunda, e cada rota para quando acaba a
+sua metade.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from statistics import quantiles
+
+from benchmarks.seed import seed, entry_fields
+from benchmarks.client import HttpClient
+from benchmarks.load_test import free_port, start_server
+
+DRIVERS = ('testclient', 'uvicorn')
+
+class Workload:
+    """Gera as requisições de cada rota sobre o banco semeado."""
+
+    def __init__(self, users, entries, rng_seed=0):
+        self.users = users
+        self.entries = entries
+        self.rng_seed = rng_seed
+        # Formulários prontos: gerar texto não deve entrar na medição.
+        rng = random.Random(rng_seed)
+        self.forms = [entry_fields(rng) for _ in range(64)]
+        # Faixas de ids separadas: uma rota de exclusão não esgota as entradas da outra.
+        half = entries // 2
+        self._next_deleted = {'del': 1, 'hx_delete': half + 1}
+        self._last_deleted = {'del': half, 'hx_delete': entries}
+        self._lock = threading.Lock()
+
+    def rng(self, worker):
+        return random.Random(f"{self.rng_seed}-{worker}")
+
+    def request(self, route, rng):
+        """Devolve (método, caminho, formulário) ou None quando a rota não tem mais o que pedir."""
+        user = rng.randint(1, self.users)
+        entry = rng.randint(1, self.entries)
+        if route == 'home':
+            return 'GET', '/', None
+        if route == 'journal':
+            return 'POST', '/journal', {'username': f"usuario{user - 1}"}
+        if route == 'submit':
+            return 'POST', f'/submit/{user}', rng.choice(self.forms)
+        if route == 'view_entries':
+            return 'GET', f'/view_entries/{user}', None
+        if route == 'all_entries':
+            return 'GET', '/all_entries', None
+        if route == 'view_entry':
+            return 'GET', f'/view_entry/{entry}', None
+        if route == 'edit':
+            return 'GET', f'/edit/{entry}', None
+        if route == 'update':
+            return 'POST', f'/update/{entry}', rng.choice(self.forms)
+        if route == 'patch':
+            field = rng.choice(tuple(self.forms[0]))
+            return 'PATCH', f'/update/{entry}', {field: rng.choice(self.forms)[field]}
+        if route in ('del', 'hx_delete'):
+            with self._lock:
+                entry = self._next_deleted[route]
+                self._next_deleted[route] += 1
+            if entry > self._last_deleted[route]:
+                return None
+            return ('GET', f'/del/{entry}', None) if route == 'del' else ('DELETE', f'/del/{entry}', None)
+        raise ValueError(f"Rota desconhecida: {route}")
+
+ROUTES = ('home', 'journal', 'submit', 'view_entries', 'all_entries', 'view_entry', 'edit', 'update', 'patch', 'del', 'hx_delete')
+
+def summarize(driver, route, concurrency, latencies, errors, elapsed):
+    result = {'driver': driver, 'route': route, 'concurrency': concurrency, 'requests': len(latencies),
+              'errors': errors, 'seconds': round(elapsed, 3), 'rps': None, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    if len(latencies) >= 2:
+        cuts = quantiles(latencies, n=100)
+        result.update(rps=round(len(latencies) / elapsed, 1), p50_ms=round(cuts[49] * 1000, 3),
+                      p95_ms=round(cuts[94] * 1000, 3), p99_ms=round(cuts[98] * 1000, 3))
+    return result
+
+def run_testclient(app, workload, route, concurrency, duration):
+    from starlette.testclient import TestClient
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def worker(index):
+        nonlocal errors
+        rng = workload.rng(index)
+        with TestClient(app) as client:
+            while time.perf_counter() < stop_at:
+                request = workload.request(route, rng)
+                if request is None:
+                    break
+                method, path, data = request
+                started = time.perf_counter()
+                response = client.request(method, path, data=data)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    errors += response.status_code >= 400
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - started
+
+async def run_http(port, workload, route, concurrency, duration):
+    latencies = []
+    errors = 0
+    stop_at = time.perf_counter() + duration
+
+    async def worker(index):
+        nonlocal errors
+        rng = workload.rng(index)
+        client = HttpClient('127.0.0.1', port)
+        try:
+            while time.perf_counter() < stop_at:
+                request = workload.request(route, rng)
+                if request is None:
+                    break
+                method, path, data = request
+                started = time.perf_counter()
+                try:
+                    status, _, _ = await client.request(method, path, data)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    errors += 1
+                    await client.close()
+                    continue
+                latencies.append(time.perf_counter() - started)
+                errors += status >= 400
+        finally:
+            await client.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+def bench_testclient(db_path, workload, routes, levels, duration, no_cache):
+    import database
+    database.configure(path=db_path)
+    from main import app
+    from cache import response_cache, user_index
+    response_cache.clear()
+    response_cache.ttl = 0 if no_cache else response_cache.ttl
+    user_index.clear()
+    for route in routes:
+        for concurrency in levels:
+            yield summarize('testclient', route, concurrency, *run_testclient(app, workload, route, concurrency, duration))
+    database.close_pool()
+
+def bench_uvicorn(app_dir, db_path, workload, routes, levels, duration, no_cache):
+    port = free_port()
+    server = start_server(app_dir, db_path, port, no_cache)
+    try:
+        for route in routes:
+            for concurrency in levels:
+                yield summarize('uvicorn', route, concurrency, *asyncio.run(run_http(port, workload, route, concurrency, duration)))
+    finally:
+        server.terminate()
+        server.wait()
+
+def git_revision(app_dir):
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=app_dir, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_result(result, baseline=None):
+    line = f"{result['driver']:<10} {result['route']:<13} c={result['concurrency']:<4}"
+    if result['rps'] is None:
+        print(f"{line} sem amostras suficientes")
+        return
+    line += (f" {result['rps']:9.1f} req/s  p50={result['p50_ms']:8.2f} ms  p95={result['p95_ms']:8.2f} ms  "
+             f"p99={result['p99_ms']:8.2f} ms  erros={result['errors']}")
+    if baseline and baseline.get('rps'):
+        line += f"  vazão {change(result['rps'], baseline['rps']):+6.1f}%  p95 {change(result['p95_ms'], baseline['p95_ms']):+6.1f}%"
+    print(line)
+
+def change(value, reference):
+    return (value - reference) / reference * 100 if reference else 0.0
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as source:
+        results = json.load(source)['results']
+    return {(r['driver'], r['route'], r['concurrency']): r for r in results}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--app-dir', default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--entries', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--duration', type=float, default=3)
+    parser.add_argument('--routes', nargs='+', choices=ROUTES, default=list(ROUTES))
+    parser.add_argument('--drivers', nargs='+', choices=DRIVERS, default=list(DRIVERS))
+    parser.add_argument('--no-cache', action='store_true', help="desativa o cache de páginas para medir o caminho até o banco")
+    parser.add_argument('-o', '--output', help="grava os resultados neste arquivo JSON")
+    parser.add_argument('--baseline', help="JSON de uma execução anterior para comparação")
+    args = parser.parse_args()
+    # Avisos da aplicação (login de usuário existente, consulta lenta) fazem parte da carga, não do relatório.
+    logging.disable(logging.WARNING)
+
+    routes = [route for route in ROUTES if route in args.routes]
+    baseline = load_baseline(args.baseline) if args.baseline else {}
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, 'seed.db')
+        seed(template, args.users, args.entries, args.seed)
+        for driver in args.drivers:
+            db_path = os.path.join(tmp, f'{driver}.db')
+            shutil.copy(template, db_path)
+            workload = Workload(args.users, args.entries, args.seed)
+            if driver == 'testclient':
+                runs = bench_testclient(db_path, workload, routes, args.concurrency, args.duration, args.no_cache)
+            else:
+                runs = bench_uvicorn(args.app_dir, db_path, workload, routes, args.concurrency, args.duration, args.no_cache)
+            for result in runs:
+                print_result(result, baseline.get((result['driver'], result['route'], result['concurrency'])))
+                results.append(result)
+
+    if args.output:
+        meta = {'revision': git_revision(args.app_dir), 'created': datetime.now().isoformat(timespec='seconds'),
+                'python': sys.version.split()[0], 'platform': platform.platform(), 'cpus': os.cpu_count(),
+                **{name: getattr(args, name) for name in ('users', 'entries', 'seed', 'concurrency', 'duration', 'no_cache')}}
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump({'meta': meta, 'results': results}, output, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""Importação e exportação em massa de entradas (NDJSON ou CSV).
+
+Uso, dentro do diretório ./CODIGO:
+
+    python bulk.py import arquivo.ndjson
+    python bulk.py export --format csv --user-id 3 -o entradas.csv
+
+Cada registro traz `username` e os campos da entrada; `timestamp` é opcional
+(ISO 8601, gravado em UTC; registros com data inválida são ignorados).
+"""
+import io
+import os
+import csv
+import sys
+import json
+import logging
+import argparse
+from datetime import datetime, timezone
+
+from cache import response_cache, user_index
+from database import connection
+from search import SEARCH_FIELDS
+from storage import BODY_FIELDS, pack, excerpt
+
+BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', '5000'))
+ENTRY_FIELDS = ('title', 'content', 'occupation', 'week_details', 'hobbies', 'hometown', 'weekend_plans')
+EXPORT_FIELDS = ('id', 'username', *ENTRY_FIELDS, 'timestamp')
+FORMATS = ('ndjson', 'csv')
+
+EXPORT_SQL = """
+    SELECT e.id, u.username, e.title, e.content, e.occupation, e.week_details, e.hobbies, e.hometown, e.weekend_plans, e.timestamp
+    FROM entries_full e
+    JOIN users u ON e.user_id = u.id
+"""
+EXPORT_ORDER = " ORDER BY e.timestamp DESC, e.id DESC"
+
+def parse_ndjson(lines):
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+def parse_csv(lines):
+    yield from csv.DictReader(lines)
+
+def parse(lines, fmt):
+    return parse_ndjson(lines) if fmt == 'ndjson' else parse_csv(lines)
+
+def format_from_name(name, default='ndjson'):
+    extension = os.path.splitext(name or '')[1].lstrip('.').lower()
+    return extension if extension in FORMATS else default
+
+def chunked(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def normalize_timestamp(value):
+    """Converte um instante ISO 8601 para o formato do CURRENT_TIMESTAMP do SQLite (UTC), ou devolve None.
+
+    A ordenação por keyset e o Last-Modified das páginas dependem desse formato.
+    Instantes sem fuso são tratados como UTC.
+    """
+    try:
+        moment = datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.isoformat(sep=' ', timespec='seconds')
+
+def clean_record(record):
+    """Devolve o registro pronto para gravar, ou None quando ele deve ser ignorado."""
+    if not isinstance(record, dict) or not record.get('username') or not record.get('title') or record.get('content') is None:
+        return None
+    row = {}
+    for field in ('username', *ENTRY_FIELDS):
+        value = record.get(field)
+        if isinstance(value, (dict, list)):
+            return None
+        row[field] = None if value is None else str(value)
+    row['timestamp'] = None
+    if record.get('timestamp'):
+        row['timestamp'] = normalize_timestamp(record['timestamp'])
+        if row['timestamp'] is None:
+            return None
+    return row
+
+def import_records(records, chunk_size=BULK_CHUNK_SIZE):
+    """Grava os registros em transações de `chunk_size` linhas e devolve (importados, ignorados).
+
+    Os usuários de cada lote são criados com um único executemany
+    (ON CONFLICT DO NOTHING); as entradas, os seus textos e o índice de
+    pesquisa entram com mais três executemany. Os ids das entradas são
+    atribuídos aqui, já com o bloqueio de escrita, para ligar cada texto à sua
+    entrada sem ler os ids de volta. Os usuários novos só entram no índice de
+    usuários depois do commit do lote.
+    """
+    imported = skipped = 0
+    try:
+        with connection() as conn:
+            for chunk in chunked(records, chunk_size):
+                rows = []
+                for record in chunk:
+                    row = clean_record(record)
+                    if row is None:
+                        skipped += 1
+                        continue
+                    rows.append(row)
+
+                created = {}
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    missing = {row['username'] for row in rows if user_index.get(row['username']) is None}
+                    if missing:
+                        conn.executemany("INSERT INTO users (username) VALUES (?) ON CONFLICT (username) DO NOTHING", [(name,) for name in missing])
+                        placeholders = ', '.join('?' * len(missing))
+                        created = dict(conn.execute(f"SELECT username, id FROM users WHERE username IN ({placeholders})", tuple(missing)))
+                    first_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM entries").fetchone()[0]
+                    conn.executemany("""
+                        INSERT INTO entries (id, user_id, title, excerpt, occupation, hometown, timestamp)
+                        VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+                    """, [(entry_id, created.get(row['username']) or user_index.get(row['username']), row['title'], excerpt(row['content']),
+                           row['occupation'], row['hometown'], row['timestamp']) for entry_id, row in enumerate(rows, first_id)])
+                    conn.executemany(f"INSERT INTO entry_bodies (entry_id, {', '.join(BODY_FIELDS)}) VALUES (?, ?, ?, ?, ?)",
+                                     [(entry_id, *(pack(row[field]) for field in BODY_FIELDS)) for entry_id, row in enumerate(rows, first_id)])
+                    conn.executemany(f"INSERT INTO entries_fts (rowid, {', '.join(SEARCH_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                     [(entry_id, *(row[field] for field in SEARCH_FIELDS)) for entry_id, row in enumerate(rows, first_id)])
+                # Um lote desfeito não pode deixar no índice ids de usuários que não existem.
+                user_index.warm(created.items())
+                imported += len(rows)
+                logging.info("Importação: %s entradas gravadas", imported)
+    finally:
+        # Lotes já gravados continuam valendo mesmo que um lote seguinte falhe.
+        if imported:
+            response_cache.clear()
+
+    if skipped:
+        logging.warning("Importação: %s registros ignorados por dados ausentes ou inválidos", skipped)
+    return imported, skipped
+
+def import_file(fileobj, fmt):
+    # fileobj é binário; a leitura e o parsing acontecem linha a linha.
+    text = io.TextIOWrapper(fileobj, encoding='utf-8', newline='')
+    try:
+        return import_records(parse(text, fmt))
+    finally:
+        text.detach()
+
+def export_query(user_id=None):
+    if user_id is None:
+        return EXPORT_SQL + EXPORT_ORDER, ()
+    return EXPORT_SQL + " WHERE e.user_id = ?" + EXPORT_ORDER, (user_id,)
+
+def render_rows(rows, fmt):
+    if fmt == 'ndjson':
+        return ''.join(json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + '\n' for row in rows)
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+def render_header(fmt):
+    return render_rows([EXPORT_FIELDS], 'csv') if fmt == 'csv' else ''
+
+def export_batches(user_id=None, fmt='ndjson', batch_size=1000):
+    sql, params = export_query(user_id)
+    yield render_header(fmt)
+    with connection() as conn:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield render_rows(rows, fmt)
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa ou exporta entradas em NDJSON ou CSV.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    importer = commands.add_parser('import', help="importa um arquivo (use - para a entrada padrão)")
+    importer.add_argument('file')
+    importer.add_argument('--format', choices=FORMATS)
+    exporter = commands.add_parser('export', help="exporta as entradas")
+    exporter.add_argument('--format', choices=FORMATS)
+    exporter.add_argument('--user-id', type=int)
+    exporter.add_argument('-o', '--output', default='-')
+    args = parser.parse_args()
+
+    from migrations import migrate
+    with connection() as conn:
+        migrate(conn)
+
+    if args.command == 'import':
+        fmt = args.format or format_from_name(args.file)
+        if args.file == '-':
+            imported, skipped = import_file(sys.stdin.buffer, fmt)
+        else:
+            with open(args.file, 'rb') as fileobj:
+                imported, skipped = import_file(fileobj, fmt)
+        logging.info("%s entradas importadas, %s ignoradas", imported, skipped)
+    else:
+        fmt = args.format or format_from_name(args.output)
+        output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+        try:
+            for chunk in export_batches(args.user_id, fmt):
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,144 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+CACHE_TTL = float(os.environ.get('CACHE_TTL', '300'))
+CACHE_SYNC_INTERVAL = float(os.environ.get('CACHE_SYNC_INTERVAL', '0'))
+
+class ResponseCache:
+    """Cache LRU em memória com expiração (TTL) e limite de bytes.
+
+    Cada chave pode receber etiquetas (por exemplo `entry:42`); `invalidate_tag`
+    remove de uma vez todas as chaves que carregam a etiqueta, o que permite
+    descartar só as páginas que mostram uma entrada alterada.
+
+    `generation` muda a cada invalidação: quem leu o banco antes de uma escrita
+    passa a geração lida para `set` e o valor já desatualizado não é guardado.
+
+    Com vários processos, cada um tem o seu cache e só vê as próprias
+    invalidações. Se `sync_interval` for positivo, `needs_sync` pede, no máximo
+    uma vez por intervalo, a versão atual do banco para `sync`, que esvazia o
+    cache quando ela mudou.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL, sync_interval=CACHE_SYNC_INTERVAL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        self.size = 0
+        self.generation = 0
+        self._version = None
+        self._next_sync = 0.0
+        self._items = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, size, tags, expires = item
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value, size, tags=(), generation=None):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._items:
+                self._remove(key)
+            self._items[key] = (value, size, tuple(tags), time.monotonic() + self.ttl)
+            self.size += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._items)))
+
+    def discard(self, *keys):
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                if key in self._items:
+                    self._remove(key)
+
+    def invalidate_tag(self, tag):
+        with self._lock:
+            self.generation += 1
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._items.clear()
+            self._tags.clear()
+            self.size = 0
+
+    def needs_sync(self):
+        if self.sync_interval <= 0:
+            return False
+        now = time.monotonic()
+        if now < self._next_sync:
+            return False
+        self._next_sync = now + self.sync_interval
+        return True
+
+    def sync(self, version):
+        # Não dá para saber o que mudou em outro processo, então tudo sai do cache.
+        with self._lock:
+            changed = self._version is not None and version != self._version
+            self._version = version
+        if changed:
+            self.clear()
+
+    def _remove(self, key):
+        _, size, tags, _ = self._items.pop(key)
+        self.size -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+response_cache = ResponseCache()
+
+class UserIndex:
+    """Mapa username -> id mantido em memória.
+
+    Usuários nunca mudam de nome nem são apagados, então uma entrada do mapa
+    nunca fica desatualizada: basta aquecê-lo na inicialização e acrescentar
+    cada usuário novo. Um usuário criado por outro processo só causa uma ida ao
+    banco na primeira vez em que aparece aqui.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._lock = threading.Lock()
+
+    def warm(self, rows):
+        ids = dict(rows)
+        with self._lock:
+            self._ids.update(ids)
+        return len(ids)
+
+    def get(self, username):
+        return self._ids.get(username)
+
+    def add(self, username, user_id):
+        with self._lock:
+            self._ids[username] = user_id
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+
+user_index = UserIndex()
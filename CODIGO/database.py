@@ -0,0 +1,385 @@
+import os
+import queue
+import asyncio
+import weakref
+import sqlite3
+import logging
+import threading
+import time
+import contextvars
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from contextlib import contextmanager
+
+from metrics import InstrumentedCursor, add_db_time
+from storage import register_functions
+
+DATABASE_PATH = os.environ.get('DATABASE_PATH', 'DATABASE.db')
+POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', '8'))
+POOL_TIMEOUT = float(os.environ.get('DATABASE_POOL_TIMEOUT', '30'))
+STATEMENT_CACHE_SIZE = 256
+WAL_MODE = os.environ.get('DATABASE_WAL', '1') == '1'
+BUSY_TIMEOUT_MS = int(os.environ.get('DATABASE_BUSY_TIMEOUT_MS', '5000'))
+CACHE_SIZE_KIB = int(os.environ.get('DATABASE_CACHE_SIZE_KIB', '16384'))
+MMAP_SIZE = int(os.environ.get('DATABASE_MMAP_SIZE', str(256 * 1024 * 1024)))
+WRITE_WINDOW_MS = float(os.environ.get('DATABASE_WRITE_WINDOW_MS', '2'))
+WRITE_BATCH_SIZE = int(os.environ.get('DATABASE_WRITE_BATCH_SIZE', '256'))
+STREAM_BATCH_SIZE = int(os.environ.get('DATABASE_STREAM_BATCH_SIZE', '200'))
+MAX_STREAMS = int(os.environ.get('DATABASE_MAX_STREAMS', str(max(POOL_SIZE // 4, 1))))
+EXECUTOR_THREADS = int(os.environ.get('DATABASE_EXECUTOR_THREADS', str(POOL_SIZE)))
+
+def pragmas():
+    # Aplicados uma única vez, quando a conexão é criada.
+    statements = [
+        f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}',
+        'PRAGMA temp_store = MEMORY',
+        f'PRAGMA cache_size = -{CACHE_SIZE_KIB}',
+        f'PRAGMA mmap_size = {MMAP_SIZE}',
+    ]
+    if WAL_MODE:
+        # Com WAL os leitores não bloqueiam o escritor, e synchronous=NORMAL só faz fsync nos checkpoints.
+        statements += ['PRAGMA journal_mode = WAL', 'PRAGMA synchronous = NORMAL']
+    return statements
+
+class InstrumentedConnection(sqlite3.Connection):
+    # Todas as consultas passam por InstrumentedCursor, que alimenta as métricas de /metrics.
+
+    def cursor(self, factory=sqlite3.Cursor):
+        return InstrumentedCursor(super().cursor(factory))
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+def connect(path=None, functions=True, **kwargs):
+    conn = sqlite3.connect(path or DATABASE_PATH, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE,
+                           factory=InstrumentedConnection, **kwargs)
+    if functions:
+        register_functions(conn)
+    for pragma in pragmas():
+        conn.execute(pragma)
+    return conn
+
+class ConnectionPool:
+    """Pool limitado de conexões SQLite reaproveitadas entre as requisições.
+
+    As conexões ociosas ficam em uma pilha (LIFO), então uma thread que devolve
+    uma conexão tende a recebê-la de volta na próxima chamada, com o cache de
+    instruções preparadas já aquecido.
+    """
+
+    def __init__(self, path, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+
+        if can_create:
+            try:
+                return connect(self.path)
+            except sqlite3.Error:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f"Tempo esgotado aguardando uma conexão livre ({self.size} em uso)")
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            with self._lock:
+                self._created -= 1
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+WriteResult = namedtuple('WriteResult', ['lastrowid', 'rowcount', 'rows'])
+
+class GroupCommitWriter:
+    """Escritor único que agrupa as escritas recebidas em uma mesma transação.
+
+    Cada chamada a `submit` entra em uma fila; a thread do escritor junta tudo o
+    que chegar dentro da janela de `window_ms` e grava o lote com um único
+    COMMIT. Cada escrita roda dentro do próprio SAVEPOINT, então uma falha só
+    desfaz a escrita que falhou e o chamador recebe o seu próprio
+    `lastrowid`/`rowcount` (e as linhas de um RETURNING) ou a sua própria exceção.
+
+    Uma escrita pode ter várias instruções, gravadas juntas ou não gravadas;
+    dentro dela, `last_insert_rowid()` se refere à instrução anterior.
+    """
+
+    def __init__(self, path, window_ms=WRITE_WINDOW_MS, batch_size=WRITE_BATCH_SIZE):
+        self.path = path
+        self.window = window_ms / 1000
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, statements):
+        """Grava a lista de (sql, params) e devolve um WriteResult por instrução."""
+        future = Future()
+        self._ensure_started()
+        self._queue.put((statements, future))
+        return future.result()
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        # Sem body_text: nenhuma escrita pode depender de uma função que só a aplicação tem.
+        conn = connect(self.path, functions=False, isolation_level=None)
+        try:
+            running = True
+            while running:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + self.window
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        running = False
+                        break
+                    batch.append(item)
+                try:
+                    self._commit(conn, batch)
+                except Exception as e:
+                    # Um erro inesperado derruba só este lote; a thread continua atendendo as próximas escritas.
+                    logging.exception("Erro inesperado no escritor: %s", e)
+                    if conn.in_transaction:
+                        conn.rollback()
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+        finally:
+            conn.close()
+
+    def _commit(self, conn, batch):
+        results = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for statements, future in batch:
+                conn.execute('SAVEPOINT write')
+                try:
+                    written = []
+                    for sql, params in statements:
+                        cursor = conn.execute(sql, params)
+                        rows = cursor.fetchall()
+                        written.append(WriteResult(cursor.lastrowid, cursor.rowcount, rows))
+                    results.append((future, written, None))
+                    conn.execute('RELEASE write')
+                except Exception as e:
+                    # Inclui erros do próprio Python ao converter parâmetros (OverflowError, tipos não suportados).
+                    conn.execute('ROLLBACK TO write')
+                    conn.execute('RELEASE write')
+                    results.append((future, None, e))
+            conn.execute('COMMIT')
+        except sqlite3.Error as e:
+            logging.error("Falha ao gravar lote de %s escritas: %s", len(batch), e)
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def close(self):
+        with self._lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+
+_pool = None
+_writer = None
+_executor = None
+_pool_lock = threading.Lock()
+_watcher = None
+_watcher_lock = threading.Lock()
+_semaphores = weakref.WeakKeyDictionary()
+_stream_semaphores = weakref.WeakKeyDictionary()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DATABASE_PATH, POOL_SIZE)
+    return _pool
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        with _pool_lock:
+            if _writer is None:
+                _writer = GroupCommitWriter(DATABASE_PATH)
+    return _writer
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _pool_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=EXECUTOR_THREADS, thread_name_prefix='sqlite')
+    return _executor
+
+def configure(path=None, size=None):
+    global DATABASE_PATH, POOL_SIZE
+    close_pool()
+    if path is not None:
+        DATABASE_PATH = path
+    if size is not None:
+        POOL_SIZE = size
+
+def close_pool():
+    global _pool, _writer, _watcher
+    with _pool_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+    with _watcher_lock:
+        if _watcher is not None:
+            _watcher.close()
+            _watcher = None
+
+def data_version():
+    """Devolve o PRAGMA data_version de uma conexão dedicada deste processo.
+
+    O número muda sempre que outra conexão grava no banco, inclusive as de
+    outros processos, então serve para saber se o cache local ficou velho.
+    """
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = connect()
+        return _watcher.execute("PRAGMA data_version").fetchone()[0]
+
+def _reset_after_fork():
+    # Conexões SQLite não podem atravessar um fork: o processo filho começa com um pool vazio.
+    global _pool, _writer, _executor, _pool_lock, _watcher, _watcher_lock
+    _pool = None
+    _writer = None
+    _executor = None
+    _pool_lock = threading.Lock()
+    _watcher = None
+    _watcher_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+@contextmanager
+def connection():
+    with get_pool().connection() as conn:
+        yield conn
+
+@contextmanager
+def transaction():
+    with connection() as conn:
+        with conn:
+            yield conn
+
+def write(sql, params=()):
+    return get_writer().submit([(sql, params)])[0]
+
+def write_all(statements):
+    return get_writer().submit(statements)
+
+def loop_semaphore(semaphores, loop, size):
+    semaphore = semaphores.get(loop)
+    if semaphore is None:
+        semaphore = semaphores[loop] = asyncio.Semaphore(size)
+    return semaphore
+
+async def run_in_db(func, *args, **kwargs):
+    """Executa uma função bloqueante de acesso ao banco sem travar o event loop.
+
+    As chamadas rodam no executor dedicado ao SQLite (DATABASE_EXECUTOR_THREADS
+    threads). Quem passa do limite espera no semáforo do próprio event loop, e
+    não em uma fila sem fim dentro do executor.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = loop_semaphore(_semaphores, loop, EXECUTOR_THREADS)
+    started = time.perf_counter()
+    try:
+        async with semaphore:
+            # O contexto copiado leva junto o timer da requisição atual para a thread do banco.
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(get_executor(), partial(context.run, func, *args, **kwargs))
+    finally:
+        add_db_time(time.perf_counter() - started)
+
+async def stream_rows(sql, params=(), batch_size=STREAM_BATCH_SIZE):
+    """Percorre o resultado de uma consulta em lotes de `fetchmany`, sem carregar tudo na memória.
+
+    Cada streaming abre a própria conexão, fora do pool, e a fecha quando o
+    gerador termina ou é fechado (por exemplo, quando o cliente desconecta no
+    meio da resposta): um cliente lento não prende uma conexão das outras
+    rotas. No máximo DATABASE_MAX_STREAMS streamings rodam ao mesmo tempo em
+    cada event loop; os seguintes aguardam a vez sem ocupar threads do executor.
+    """
+    async with loop_semaphore(_stream_semaphores, asyncio.get_running_loop(), MAX_STREAMS):
+        conn = await run_in_db(connect)
+        try:
+            cursor = await run_in_db(conn.execute, sql, params)
+            while True:
+                rows = await run_in_db(cursor.fetchmany, batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
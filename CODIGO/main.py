@@ -1,199 +1,360 @@
 from fasthtml.common import *
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from collections import namedtuple
+from cache import response_cache, user_index
+from database import connection, transaction, write_all, run_in_db, stream_rows, data_version
+from starlette.responses import StreamingResponse
+from starlette.middleware import Middleware
+from metrics import MetricsMiddleware, render_metrics
+from migrations import migrate
+from search import match_query, highlighted, MARK_START, MARK_END
+from bulk import ENTRY_FIELDS, FORMATS, import_file, export_query, render_header, render_rows
+from storage import BODY_FIELDS, pack, excerpt
+from render import STYLESHEET, ENTRY_CARD, ENTRY_LINK, ENTRY_FIELD, ENTRY_DETAIL_ACTIONS, SEARCH_RESULT
+from urllib.parse import urlencode
+import os
+import csv
+import hashlib
+import tempfile
 import sqlite3
 import logging
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper(), format='%(asctime)s - %(levelname)s - %(message)s')
+
+PAGE_SIZE = 50
+IMPORT_SPOOL_SIZE = 8 * 1024 * 1024
 
 def setup_db():
     try:
-        conn = sqlite3.connect('DATABASE.db')
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND (name='users' OR name='entries')")
-        existing_tables = cursor.fetchall()
-
-        if len(existing_tables) < 2:  
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY,
-                    username TEXT UNIQUE NOT NULL
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS entries (
-                    id INTEGER PRIMARY KEY,
-                    user_id INTEGER,
-                    title TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    occupation TEXT,
-                    week_details TEXT,
-                    hobbies TEXT,
-                    hometown TEXT,
-                    weekend_plans TEXT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
-            conn.commit()
-            logging.info("Configuração do banco de dados bem-sucedida - tabelas criadas!")
+        with connection() as conn:
+            applied = migrate(conn)
+        if applied:
+            logging.info("Configuração do banco de dados bem-sucedida - %s migrações aplicadas!", applied)
         else:
             logging.info("O banco de dados já existe - nenhuma configuração necessária!")
+    except sqlite3.Error as e:
+        logging.error("Falha na configuração do banco de dados: %s", e)
 
+def warm_user_index():
+    try:
+        with connection() as conn:
+            count = user_index.warm(conn.execute("SELECT username, id FROM users"))
+        logging.info("Índice de usuários carregado: %s usuários", count)
     except sqlite3.Error as e:
-        logging.error(f"Falha na configuração do banco de dados: {e}")
-    finally:
-        conn.close()
+        logging.error("Erro ao carregar o índice de usuários: %s", e)
 
-setup_db()
+def startup():
+    # Roda em cada processo quando o servidor sobe, e não na importação: com o esquema em dia,
+    # setup_db é só uma leitura de PRAGMA user_version (server.py migra antes de iniciar os workers).
+    setup_db()
+    warm_user_index()
 
 def create_user(username):
-    try:
-        conn = sqlite3.connect('DATABASE.db')
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username) VALUES (?)", (username,))
-        conn.commit()
-        user_id = cursor.lastrowid
-        logging.info(f"Usuário criado com sucesso: {username}")
+    user_id = user_index.get(username)
+    if user_id is not None:
         return user_id
-    except sqlite3.IntegrityError:
-        logging.warning(f"Usuário já existe: {username}")
-        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-        return cursor.fetchone()[0]
+    try:
+        with transaction() as conn:
+            created = conn.execute("INSERT INTO users (username) VALUES (?) ON CONFLICT (username) DO NOTHING RETURNING id", (username,)).fetchone()
+            row = created or conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
+        user_index.add(username, row[0])
+        if created:
+            logging.info("Usuário criado com sucesso: %s", username)
+        else:
+            logging.warning("Usuário já existe: %s", username)
+        return row[0]
     except sqlite3.Error as e:
-        logging.error(f"Erro ao criar usuário: {e}")
+        logging.error("Erro ao criar usuário: %s", e)
         return None
-    finally:
-        conn.close()
 
 def get_user_id(username):
+    user_id = user_index.get(username)
+    if user_id is not None:
+        return user_id
     try:
-        conn = sqlite3.connect('DATABASE.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-        result = cursor.fetchone()
+        with connection() as conn:
+            result = conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
+        if result:
+            user_index.add(username, result[0])
         return result[0] if result else None
     except sqlite3.Error as e:
-        logging.error(f"Erro ao obter ID do usuário: {e}")
+        logging.error("Erro ao obter ID do usuário: %s", e)
         return None
-    finally:
-        conn.close()
 
 def create_entry(user_id, title, content, occupation, week_details, hobbies, hometown, weekend_plans):
     try:
-        conn = sqlite3.connect('DATABASE.db')
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO entries (user_id, title, content, occupation, week_details, hobbies, hometown, weekend_plans)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (user_id, title, content, occupation, week_details, hobbies, hometown, weekend_plans))
-        conn.commit()
-        entry_id = cursor.lastrowid
-        logging.info(f"Entrada criada com sucesso para o usuário: {user_id}")
+        entry_id = write_all([
+            ("INSERT INTO entries (user_id, title, excerpt, occupation, hometown) VALUES (?, ?, ?, ?, ?)",
+             (user_id, title, excerpt(content), occupation, hometown)),
+            ("INSERT INTO entry_bodies (entry_id, content, week_details, hobbies, weekend_plans) VALUES (last_insert_rowid(), ?, ?, ?, ?)",
+             (pack(content), pack(week_details), pack(hobbies), pack(weekend_plans))),
+            # O rowid de entry_bodies é o próprio entry_id.
+            ("INSERT INTO entries_fts (rowid, title, content, week_details, hobbies, hometown, weekend_plans) VALUES (last_insert_rowid(), ?, ?, ?, ?, ?, ?)",
+             (title, content, week_details, hobbies, hometown, weekend_plans)),
+        ])[0].lastrowid
+        # Uma entrada nova só aparece nas primeiras páginas; as demais são chaveadas pelo cursor e continuam válidas.
+        response_cache.discard(('user', user_id, None), ('all', None))
+        logging.info("Entrada criada com sucesso para o usuário: %s", user_id)
         return entry_id
     except sqlite3.Error as e:
-        logging.error(f"Erro ao criar entrada: {e}")
+        logging.error("Erro ao criar entrada: %s", e)
         return None
-    finally:
-        conn.close()
 
-def get_entries(user_id):
+def encode_cursor(entry):
+    # O cursor é a chave (timestamp, id) da última entrada da página.
+    return f"{entry[-1]}|{entry[0]}"
+
+def decode_cursor(cursor):
+    try:
+        timestamp, entry_id = cursor.rsplit('|', 1)
+        return timestamp, int(entry_id)
+    except (AttributeError, ValueError):
+        return None
+
+def paginate(rows, limit):
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
+
+def get_entries(user_id, key=None, limit=PAGE_SIZE):
+    # `key` é o cursor já decodificado por decode_cursor.
     try:
-        conn = sqlite3.connect('DATABASE.db')
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, title, content, occupation, week_details, hobbies, hometown, weekend_plans, timestamp
-            FROM entries WHERE user_id = ? ORDER BY timestamp DESC
-        """, (user_id,))
-        entries = cursor.fetchall()
-        logging.info(f"Recuperado {len(entries)} entradas para usuário {user_id}")
-        return entries
+        with connection() as conn:
+            if key:
+                entries = conn.execute("""
+                    SELECT id, title, excerpt, occupation, hometown, timestamp
+                    FROM entries WHERE user_id = ? AND (timestamp, id) < (?, ?)
+                    ORDER BY timestamp DESC, id DESC LIMIT ?
+                """, (user_id, *key, limit + 1)).fetchall()
+            else:
+                entries = conn.execute("""
+                    SELECT id, title, excerpt, occupation, hometown, timestamp
+                    FROM entries WHERE user_id = ?
+                    ORDER BY timestamp DESC, id DESC LIMIT ?
+                """, (user_id, limit + 1)).fetchall()
+        entries, next_cursor = paginate(entries, limit)
+        logging.debug("Recuperado %d entradas para usuário %s", len(entries), user_id)
+        return entries, next_cursor
     except sqlite3.Error as e:
-        logging.error(f"Erro ao recuperar entradas: {e}")
-        return []
-    finally:
-        conn.close()
+        logging.error("Erro ao recuperar entradas: %s", e)
+        return [], None
 
 def get_entry(entry_id):
     try:
-        conn = sqlite3.connect('DATABASE.db')
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, user_id, title, content, occupation, week_details, hobbies, hometown, weekend_plans, timestamp
-            FROM entries WHERE id = ?
-        """, (entry_id,))
-        entry = cursor.fetchone()
+        with connection() as conn:
+            entry = conn.execute("""
+                SELECT id, user_id, title, content, occupation, week_details, hobbies, hometown, weekend_plans, timestamp
+                FROM entries_full WHERE id = ?
+            """, (entry_id,)).fetchone()
         if entry:
-            logging.info(f"Entrada recuperada: {entry_id}")
+            logging.debug("Entrada recuperada: %s", entry_id)
             return entry
         else:
-            logging.warning(f"Nenhuma entrada encontrada com id: {entry_id}")
+            logging.warning("Nenhuma entrada encontrada com id: %s", entry_id)
             return None
     except sqlite3.Error as e:
-        logging.error(f"Erro ao recuperar entrada: {e}")
+        logging.error("Erro ao recuperar entrada: %s", e)
         return None
-    finally:
-        conn.close()
 
-def get_all_entries():
+def get_all_entries(key=None, limit=PAGE_SIZE):
     try:
-        conn = sqlite3.connect('DATABASE.db')
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT e.id, e.title, u.username
-            FROM entries e
-            JOIN users u ON e.user_id = u.id
-            ORDER BY e.timestamp DESC
-        """)
-        entries = cursor.fetchall()
-        logging.info(f"Recuperado {len(entries)} entradas totais")
-        return entries
+        with connection() as conn:
+            if key:
+                entries = conn.execute("""
+                    SELECT e.id, e.title, u.username, e.timestamp
+                    FROM entries e
+                    JOIN users u ON e.user_id = u.id
+                    WHERE (e.timestamp, e.id) < (?, ?)
+                    ORDER BY e.timestamp DESC, e.id DESC LIMIT ?
+                """, (*key, limit + 1)).fetchall()
+            else:
+                entries = conn.execute("""
+                    SELECT e.id, e.title, u.username, e.timestamp
+                    FROM entries e
+                    JOIN users u ON e.user_id = u.id
+                    ORDER BY e.timestamp DESC, e.id DESC LIMIT ?
+                """, (limit + 1,)).fetchall()
+        entries, next_cursor = paginate(entries, limit)
+        logging.debug("Recuperado %d entradas totais", len(entries))
+        return entries, next_cursor
     except sqlite3.Error as e:
-        logging.error(f"Erro ao recuperar todas as entradas: {e}")
+        logging.error("Erro ao recuperar todas as entradas: %s", e)
+        return [], None
+
+def stream_entries(user_id):
+    return stream_rows("""
+        SELECT id, title, excerpt, occupation, hometown, timestamp
+        FROM entries WHERE user_id = ?
+        ORDER BY timestamp DESC, id DESC
+    """, (user_id,))
+
+def stream_all_entries():
+    return stream_rows("""
+        SELECT e.id, e.title, u.username, e.timestamp
+        FROM entries e
+        JOIN users u ON e.user_id = u.id
+        ORDER BY e.timestamp DESC, e.id DESC
+    """)
+
+def remove_entry(entry_id):
+    with transaction() as conn:
+        deleted = conn.execute("DELETE FROM entries WHERE id = ?", (entry_id,)).rowcount > 0
+    if deleted:
+        response_cache.invalidate_tag(f'entry:{entry_id}')
+    return deleted
+
+def search_entries(text, offset=0, limit=PAGE_SIZE):
+    query = match_query(text)
+    if not query:
+        return [], None
+    try:
+        with connection() as conn:
+            results = conn.execute("""
+                SELECT e.id, u.username, e.timestamp,
+                       highlight(entries_fts, 0, ?, ?),
+                       snippet(entries_fts, -1, ?, ?, '...', 24)
+                FROM entries_fts
+                JOIN entries e ON e.id = entries_fts.rowid
+                JOIN users u ON u.id = e.user_id
+                WHERE entries_fts MATCH ?
+                ORDER BY rank, e.id
+                LIMIT ? OFFSET ?
+            """, (MARK_START, MARK_END, MARK_START, MARK_END, query, limit + 1, offset)).fetchall()
+        next_offset = offset + limit if len(results) > limit else None
+        logging.debug("Pesquisa '%s' retornou %d entradas", text, min(len(results), limit))
+        return results[:limit], next_offset
+    except sqlite3.Error as e:
+        logging.error("Erro ao pesquisar entradas: %s", e)
+        return [], None
+
+def update_entry(entry_id, fields):
+    """Grava só os campos de `fields` cujo valor mudou e devolve a lista deles.
+
+    Sem mudanças nada é gravado (a data e o cache ficam como estão) e a lista
+    volta vazia; None indica entrada inexistente ou erro.
+
+    A leitura feita aqui só escolhe os campos que o formulário alterou; quem
+    decide se algo mudou é o WHERE da própria escrita, dentro da transação do
+    escritor. Se uma edição concorrente já gravou os mesmos valores, nada é
+    gravado e a lista volta vazia.
+    """
+    entry = get_entry(entry_id)
+    if not entry:
+        return None
+    current = dict(zip(ENTRY_FIELDS, entry[2:9]))
+    changed = {field: value for field, value in fields.items() if (value or '') != (current[field] or '')}
+    if not changed:
+        logging.debug("Publicação %s sem alterações", entry_id)
         return []
-    finally:
-        conn.close()
 
-def update_entry(entry_id, title, content, occupation, week_details, hobbies, hometown, weekend_plans):
+    # Os nomes das colunas vêm de ENTRY_FIELDS, nunca do formulário.
+    columns = [field for field in ('title', 'occupation', 'hometown') if field in changed]
+    params = [changed[field] for field in columns]
+    guards = [f"COALESCE({field}, '') IS NOT ?" for field in columns]
+    guard_params = [value or '' for value in params]
+    if 'content' in changed:
+        columns.append('excerpt')
+        params.append(excerpt(changed['content']))
+    bodies = [field for field in BODY_FIELDS if field in changed]
+    if bodies:
+        # Os textos são comparados já comprimidos: pack é determinístico para o mesmo texto.
+        guards.append(f"""EXISTS (SELECT 1 FROM entry_bodies WHERE entry_id = entries.id AND ({
+            ' OR '.join(f"COALESCE({field}, '') IS NOT ?" for field in bodies)}))""")
+        guard_params += [pack(changed[field] or '') for field in bodies]
+    statements = [(f"""
+        UPDATE entries SET {''.join(f'{column} = ?, ' for column in columns)}timestamp = CURRENT_TIMESTAMP
+        WHERE id = ? AND ({' OR '.join(guards)})
+        RETURNING user_id
+    """, (*params, entry_id, *guard_params))]
+    if bodies:
+        # changes() é o número de linhas da instrução anterior: os textos só são gravados junto com a entrada.
+        statements.append((f"UPDATE entry_bodies SET {', '.join(f'{field} = ?' for field in bodies)} WHERE entry_id = ? AND changes() > 0",
+                           (*(pack(changed[field]) for field in bodies), entry_id)))
+        # Título e cidade chegam ao índice pelo gatilho; o texto das histórias, só daqui.
+        statements.append((f"UPDATE entries_fts SET {', '.join(f'{field} = ?' for field in bodies)} WHERE rowid = ? AND changes() > 0",
+                           (*(changed[field] for field in bodies), entry_id)))
     try:
-        conn = sqlite3.connect('DATABASE.db')
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE entries 
-            SET title = ?, content = ?, occupation = ?, week_details = ?, hobbies = ?, hometown = ?, weekend_plans = ?, timestamp = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (title, content, occupation, week_details, hobbies, hometown, weekend_plans, entry_id))
-        conn.commit()
-        if cursor.rowcount > 0:
-            logging.info(f"Entrada {entry_id} atualizado com sucesso")
-            return True
+        result = write_all(statements)[0]
+        if result.rows:
+            # O novo timestamp leva a entrada para o topo das listagens.
+            response_cache.invalidate_tag(f'entry:{entry_id}')
+            response_cache.discard(('user', result.rows[0][0], None), ('all', None))
+            logging.info("Publicação %s atualizada com sucesso: %s", entry_id, ', '.join(changed))
+            return list(changed)
         else:
-            logging.warning(f"Nenhuma entrada encontrada com id: {entry_id}")
-            return False
+            # A entrada já tinha esses valores (edição concorrente) ou foi apagada depois da leitura.
+            logging.debug("Publicação %s sem alterações", entry_id)
+            return []
     except sqlite3.Error as e:
-        logging.error(f"Erro ao atualizar a entrada: {e}")
-        return False
-    finally:
-        conn.close()
+        logging.error("Erro ao atualizar a publicação: %s", e)
+        return None
+
+CachedPage = namedtuple('CachedPage', ['html', 'etag', 'last_modified'])
 
-app, rt = fast_app()
+def http_date(timestamp):
+    # Os timestamps do SQLite (CURRENT_TIMESTAMP) estão em UTC; um valor fora desse formato só fica sem Last-Modified.
+    try:
+        moment = datetime.strptime(str(timestamp)[:19], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+    return format_datetime(moment, usegmt=True)
+
+def cache_page(key, html, tags, generation, last_modified=None):
+    # Só páginas com entradas vão para o cache: são as tags delas que o invalidam.
+    etag = f'W/"{hashlib.blake2b(html.encode(), digest_size=16).hexdigest()}"'
+    page = CachedPage(html, etag, last_modified)
+    if tags:
+        response_cache.set(key, page, len(html), tags, generation)
+    return page
+
+async def cached_page(key):
+    if response_cache.needs_sync():
+        response_cache.sync(await run_in_db(data_version))
+    return response_cache.get(key)
+
+def not_modified(req, page):
+    if_none_match = req.headers.get('if-none-match')
+    if if_none_match is not None:
+        return page.etag in [tag.strip() for tag in if_none_match.split(',')]
+    if_modified_since = req.headers.get('if-modified-since')
+    if if_modified_since and page.last_modified:
+        try:
+            return parsedate_to_datetime(page.last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def page_response(req, page, *components):
+    headers = {'ETag': page.etag, 'Cache-Control': 'no-cache'}
+    if page.last_modified:
+        headers['Last-Modified'] = page.last_modified
+    if not_modified(req, page):
+        return Response(status_code=304, headers=headers)
+    return (*components, *[HttpHeader(name, value) for name, value in headers.items()])
+
+app, rt = fast_app(hdrs=(Style(STYLESHEET),), middleware=[Middleware(MetricsMiddleware)], on_startup=[startup])
+
+@rt('/metrics')
+async def get():
+    return Response(render_metrics(), media_type='text/plain; version=0.0.4; charset=utf-8')
 
 @rt('/')
-def get():
+async def get():
     return Titled("PÁGINA INICIAL",
         Form(
             Input(id='username', placeholder='DIGITE SEU USUÁRIO!'),
             Button("ENTRAR", hx_post='/journal', hx_target='#content'),
             id='login-form',
         ),
-        A("ENTRADAS", href='/all_entries', style='display: inline-block; padding: 10px 20px; margin-top: 10px; margin-bottom: 10px; background-color: #007bff; color: white; text-align: center; text-decoration: none; border-radius: 5px; font-size: 16px; font-weight: bold; cursor: pointer; transition: background-color 0.3s ease;'),
+        A("ENTRADAS", href='/all_entries', cls='btn btn-inline'),
+        A("PESQUISAR", href='/search', cls='btn'),
         Div(id='content')
     )
 
 @rt('/journal')
-def post(username: str):
-    user_id = create_user(username)
+async def post(username: str):
+    user_id = await run_in_db(create_user, username)
     if user_id:
         return journal_page(user_id, username)
     else:
@@ -221,110 +382,179 @@ def journal_page(user_id, username):
         A(
             "INICIO",
             href='/view_entries/',
-            style='display: inline-block; padding: 10px 20px; margin-top: 10px; background-color: #007bff; margin-bottom: 10px; color: white; text-align: center; text-decoration: none; font-size: 16px; font-weight: bold; cursor: pointer; transition: background-color 0.3s ease;'
+            cls='btn btn-inline btn-square'
         ),
 
         Div(id='entries')
     )
     
 @rt('/submit/{user_id}')
-def post(user_id: int, title: str, content: str, occupation: str, week_details: str, hobbies: str, hometown: str, weekend_plans: str):
-    entry_id = create_entry(user_id, title, content, occupation, week_details, hobbies, hometown, weekend_plans)
+async def post(user_id: int, title: str, content: str, occupation: str, week_details: str, hobbies: str, hometown: str, weekend_plans: str):
+    entry_id = await run_in_db(create_entry, user_id, title, content, occupation, week_details, hobbies, hometown, weekend_plans)
     if entry_id:
-        return entry_div(entry_id, title, content, occupation, week_details, hobbies, hometown, weekend_plans, datetime.now())
+        return NotStr(entry_div(entry_id, title, excerpt(content), occupation, hometown, datetime.now()))
     else:
         return "Erro ao enviar a entrada. Tente novamente!"
 
 @rt('/view_entries/{user_id}')
-def get(user_id: int):
-    entries = list_entries(user_id)
-    return Titled("VER ENTRADAS:",
-        A("HOME", href='/', style='display: inline-block; padding: 10px 20px; margin: 10px; background-color: #007bff; color: white; text-align: center; text-decoration: none; border-radius: 5px; font-size: 16px; font-weight: bold; cursor: pointer; transition: background-color 0.3s ease;'),
-        Div(*entries)
-    )
+async def get(req, user_id: int, cursor: str = None, stream: bool = False):
+    if stream:
+        return streaming_page(req, "VER ENTRADAS:", stream_entries(user_id), lambda entry: entry_div(*entry))
+    key = decode_cursor(cursor) if cursor else None
+    if cursor and key is None:
+        return Response("Cursor inválido.", status_code=400)
+    page = await list_entries(user_id, key)
+    if key:
+        return page_response(req, page, NotStr(page.html))
+    return page_response(req, page, *Titled("VER ENTRADAS:",
+        A("HOME", href='/', cls='btn'),
+        Div(NotStr(page.html))
+    ))
 
 @rt('/all_entries')
-def get():
-    entries = get_all_entries()
-
-    entry_links = [
-        Div(
-            A(
-                f"{entry[1]} COM USUÁRIO: {entry[2]}", 
-                href=f'/view_entry/{entry[0]}',
-                style='display: inline-block; padding: 10px 20px; margin: 10px; background-color: red; color: white; text-align: center; text-decoration: none; border-radius: 5px; font-size: 16px; font-weight: bold; cursor: pointer; transition: background-color 0.3s ease;'
-            )
-        ) for entry in entries
-    ]
+async def get(req, cursor: str = None, stream: bool = False):
+    if stream:
+        return streaming_page(req, "TODAS AS ENTRADAS:", stream_all_entries(),
+                              lambda entry: ENTRY_LINK(entry_id=entry[0], title=entry[1], username=entry[2]))
+    key = decode_cursor(cursor) if cursor else None
+    if cursor and key is None:
+        return Response("Cursor inválido.", status_code=400)
+    page = await all_entries_page(key)
+    if key:
+        return page_response(req, page, NotStr(page.html))
     
-    return Titled("TODAS AS ENTRADAS:",
+    return page_response(req, page, *Titled("TODAS AS ENTRADAS:",
         A(
             "HOME", 
             href='/', 
-            style='display: inline-block; padding: 10px 20px; margin: 10px; background-color: #007bff; color: white; text-align: center; text-decoration: none; border-radius: 5px; font-size: 16px; font-weight: bold; cursor: pointer; transition: background-color 0.3s ease;'
+            cls='btn'
         ),
-        Div(*entry_links)  
+        Div(NotStr(page.html))  
+    ))
+
+async def all_entries_page(key=None):
+    page = await cached_page(('all', key))
+    if page is not None:
+        return page
+
+    generation = response_cache.generation
+    entries, next_cursor = await run_in_db(get_all_entries, key)
+
+    entry_links = [ENTRY_LINK(entry_id=entry[0], title=entry[1], username=entry[2]) for entry in entries]
+    if next_cursor:
+        entry_links.append(to_xml(next_page_loader('/all_entries', cursor=next_cursor), indent=False))
+    # Listas não levam Last-Modified: apagar uma entrada antiga muda a página sem mudar a data mais recente dela.
+    return cache_page(('all', key), ''.join(entry_links), [f'entry:{entry[0]}' for entry in entries], generation)
+
+@rt('/search')
+async def get(q: str = '', offset: int = 0):
+    results, next_offset = await run_in_db(search_entries, q, offset)
+    items = [search_result_div(*result) for result in results]
+    if next_offset:
+        items.append(to_xml(next_page_loader('/search', q=q, offset=next_offset), indent=False))
+    if offset:
+        return NotStr(''.join(items))
+
+    return Titled("PESQUISAR ENTRADAS:",
+        A("HOME", href='/', cls='btn'),
+        Form(
+            Input(id='search-query', name='q', value=q, placeholder='PESQUISE NAS ENTRADAS!'),
+            Button("PESQUISAR"),
+            action='/search', method='get'
+        ),
+        Div(NotStr(''.join(items))) if items or not q else P(f"Nenhuma entrada encontrada para: {q}")
     )
 
+def search_result_div(entry_id, username, timestamp, title, excerpt):
+    return SEARCH_RESULT(entry_id=entry_id, username=username, timestamp=timestamp,
+                         title=NotStr(highlighted(title)), excerpt=NotStr(highlighted(excerpt)))
+
 @rt('/view_entry/{entry_id}')
-def get(entry_id: int):
-    entry = get_entry(entry_id)
-    if entry:
-        fields = [
-            ("TÍTULO", entry[2]),
-            ("HISTÓRIA", entry[3]),
-            ("OCUPAÇÃO", entry[4]),
-            ("PLANOS DE FIM DE SEMANA", entry[5]),
-            ("HÁBITOS", entry[6]),
-            ("CIDADE NATAL", entry[7]),
-            ("PLANOS DE FIM DE SEMANA", entry[8]),
-            ("ÚLTIMA ATUALIZAÇÃO", entry[9])
-        ]
-        entry_details = [Div(
-            Div(field[0], style="font-weight: bold; display: inline-block; width: 150px;"),
-            " -> ",
-            field[1],
-            style="margin-bottom: 10px;"
-        ) for field in fields]
-        return Titled(f"VER ENTRADA {entry_id}",
-            A("INÍCIO", href='/', style='display: inline-block; padding: 10px 20px; margin: 10px; background-color: #007bff; color: white; text-align: center; text-decoration: none; border-radius: 5px; font-size: 16px; font-weight: bold; cursor: pointer; transition: background-color 0.3s ease;'),
-            Div(*entry_details),
-            A("EDITAR", href=f'/edit/{entry_id}', style='display: inline-block; padding: 10px 20px; margin: 10px; background-color: #007bff; color: white; text-align: center; text-decoration: none; border-radius: 5px; font-size: 16px; font-weight: bold; cursor: pointer; transition: background-color 0.3s ease;'),
-            A("APAGAR", href=f'/del/{entry_id}', style='display: inline-block; padding: 10px 20px; margin: 10px; background-color: #007bff; color: white; text-align: center; text-decoration: none; border-radius: 5px; font-size: 16px; font-weight: bold; cursor: pointer; transition: background-color 0.3s ease;')
-        )
+async def get(req, entry_id: int):
+    page = await entry_page(entry_id)
+    if page:
+        return page_response(req, page, *Titled(f"VER ENTRADA {entry_id}", NotStr(page.html)))
     else:
         return Titled("ENTRADA NÃO ENCONTRADA",
             A("INÍCIO", href='/'),
             P(f"Entrada {entry_id} não encontrada.")
         )
 
-def list_entries(user_id):
-    entries = get_entries(user_id)
-    return [entry_div(entry[0], entry[1], entry[2], entry[3], entry[4], entry[5], entry[6], entry[7], entry[8]) for entry in entries]
+HOME_LINK = to_xml(A("INÍCIO", href='/', cls='btn'), indent=False)
+
+async def entry_page(entry_id):
+    key = ('entry', entry_id)
+    page = await cached_page(key)
+    if page is not None:
+        return page
 
-def entry_div(entry_id, title, content, occupation, week_details, hobbies, hometown, weekend_plans, timestamp):
+    generation = response_cache.generation
+    entry = await run_in_db(get_entry, entry_id)
+    if not entry:
+        return None
+    fields = [
+        ("TÍTULO", entry[2]),
+        ("HISTÓRIA", entry[3]),
+        ("OCUPAÇÃO", entry[4]),
+        ("PLANOS DE FIM DE SEMANA", entry[5]),
+        ("HÁBITOS", entry[6]),
+        ("CIDADE NATAL", entry[7]),
+        ("PLANOS DE FIM DE SEMANA", entry[8]),
+        ("ÚLTIMA ATUALIZAÇÃO", entry[9])
+    ]
+    entry_details = ''.join(ENTRY_FIELD(label=label, value=value) for label, value in fields)
+    html = f"{HOME_LINK}<div>{entry_details}</div>{ENTRY_DETAIL_ACTIONS(entry_id=entry_id)}"
+    return cache_page(key, html, [f'entry:{entry_id}'], generation, http_date(entry[9]))
+
+async def list_entries(user_id, key=None):
+    page = await cached_page(('user', user_id, key))
+    if page is not None:
+        return page
+
+    generation = response_cache.generation
+    entries, next_cursor = await run_in_db(get_entries, user_id, key)
+    items = [entry_div(*entry) for entry in entries]
+    if next_cursor:
+        items.append(to_xml(next_page_loader(f'/view_entries/{user_id}', cursor=next_cursor), indent=False))
+    return cache_page(('user', user_id, key), ''.join(items), [f'entry:{entry[0]}' for entry in entries], generation)
+
+STREAM_MARKER = '<!--entries-->'
+
+def streaming_page(req, title, batches, render_row):
+    # Envia o cabeçalho da página na hora e depois cada lote de linhas assim que sai do cursor.
+    page = to_xml(respond(req, [Title(title)], [Main(H1(title), A("HOME", href='/', cls='btn'), Div(NotStr(STREAM_MARKER)), cls='container')]))
+    head, tail = page.split(STREAM_MARKER)
+
+    async def chunks():
+        yield head
+        try:
+            async for rows in batches:
+                yield ''.join(render_row(row) for row in rows)
+        except sqlite3.Error as e:
+            logging.error("Erro ao transmitir entradas: %s", e)
+        finally:
+            await batches.aclose()
+        yield tail
+
+    return StreamingResponse(chunks(), media_type='text/html')
+
+def next_page_loader(url, **params):
+    # Substitui a si mesmo pela próxima página quando aparece na tela (rolagem infinita).
     return Div(
-        H3(title),
-        P(f"ESTÓRIA: {content}"),
-        P(f"OCUPAÇÃO: {occupation}"),
-        P(f"DETALHES DA SEMANA: {week_details}"),
-        P(f"HÁBITOS: {hobbies}"),
-        P(f"CIDADE NATAL: {hometown}"),
-        P(f"PLANOS DE FIM DE SEMANA: {weekend_plans}"),
-        P(f"POSTADO EM: {timestamp}"),
-        Div(
-            A("EDITAR", href=f'/edit/{entry_id}', 
-              style='display: inline-block; padding: 10px 20px; margin: 10px; background-color: #007bff; color: white; text-align: center; text-decoration: none; border-radius: 5px; font-size: 16px; font-weight: bold; cursor: pointer; transition: background-color 0.3s ease;'),
-            A("APAGAR", href=f'/del/{entry_id}', 
-              style='display: inline-block; padding: 10px 20px; margin: 10px; background-color: #dc3545; color: white; text-align: center; text-decoration: none; border-radius: 5px; font-size: 16px; font-weight: bold; cursor: pointer; transition: background-color 0.3s ease;'),
-            style="display: flex; justify-content: start; gap: 10px; margin-top: 10px;"
-        ),
-        id=f'entry-{entry_id}'
+        P("CARREGANDO..."),
+        hx_get=f"{url}?{urlencode(params)}",
+        hx_trigger='revealed',
+        hx_swap='outerHTML',
+        cls='next-page'
     )
 
+def entry_div(entry_id, title, excerpt, occupation, hometown, timestamp):
+    return ENTRY_CARD(entry_id=entry_id, title=title, excerpt=excerpt, occupation=occupation, hometown=hometown, timestamp=timestamp)
+
 @rt('/update/{entry_id}')
-def post(entry_id: int, title: str, content: str, occupation: str, week_details: str, hobbies: str, hometown: str, weekend_plans: str):
-    if update_entry(entry_id, title, content, occupation, week_details, hobbies, hometown, weekend_plans):
+async def post(entry_id: int, title: str, content: str, occupation: str, week_details: str, hobbies: str, hometown: str, weekend_plans: str):
+    fields = dict(title=title, content=content, occupation=occupation, week_details=week_details, hobbies=hobbies, hometown=hometown, weekend_plans=weekend_plans)
+    if await run_in_db(update_entry, entry_id, fields) is not None:
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         return Div(
             P(f"ALTERAÇÕES SALVAS COM SUCESSO EM {current_time}"),
@@ -333,9 +563,21 @@ def post(entry_id: int, title: str, content: str, occupation: str, week_details:
     else:
         return "ERRO AO ATUALIZAR A PUBLICAÇÃO. TENTE NOVAMENTE."
 
+@rt('/update/{entry_id}')
+async def patch(req, entry_id: int):
+    # Usado pelo formulário de edição (hx-patch): campos ausentes ficam como estão e a resposta é só o aviso.
+    form = await req.form()
+    changed = await run_in_db(update_entry, entry_id, {field: form[field] for field in ENTRY_FIELDS if field in form})
+    if changed is None:
+        return P("ERRO AO ATUALIZAR A PUBLICAÇÃO. TENTE NOVAMENTE.")
+    if not changed:
+        return P("NENHUMA ALTERAÇÃO PARA SALVAR.")
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return P(f"ALTERAÇÕES SALVAS COM SUCESSO EM {current_time}"), A("VER ENTRADA", href=f'/view_entry/{entry_id}', cls='btn')
+
 @rt('/edit/{entry_id}')
-def get(entry_id: int):
-    entry = get_entry(entry_id)
+async def get(entry_id: int):
+    entry = await run_in_db(get_entry, entry_id)
     if entry:
         return Titled(f"EDITAR PUBLICAÇÃO {entry_id}",
             Form(
@@ -346,7 +588,7 @@ def get(entry_id: int):
                 Div("HÁBITOS:", Textarea(id=f'edit-hobbies-{entry_id}', name='hobbies', placeholder='Seus hobbies')(entry[6])),
                 Div("CIDADE NATAL:", Input(id=f'edit-hometown-{entry_id}', name='hometown', placeholder='Sua cidade natal', value=entry[7])),
                 Div("PLANOS DE FIM DE SEMANA:", Textarea(id=f'edit-weekend-plans-{entry_id}', name='weekend_plans', placeholder='Seus planos para o próximo fim de semana')(entry[8])),
-                Button("SALVAR", hx_post=f'/update/{entry_id}', hx_target='#notification'),
+                Button("SALVAR", hx_patch=f'/update/{entry_id}', hx_target='#notification'),
                 id=f'edit-form-{entry_id}'
             ),
             Div(id='notification')
@@ -357,62 +599,78 @@ def get(entry_id: int):
             P(f"Publicação {entry_id} não encontrada.")
         )
 
+@rt('/import')
+async def post(req):
+    # Lê o corpo direto do stream (não é um formulário); acima de IMPORT_SPOOL_SIZE o buffer vai para o disco.
+    fmt = req.query_params.get('format') or ('csv' if 'csv' in req.headers.get('content-type', '') else 'ndjson')
+    if fmt not in FORMATS:
+        return JSONResponse({'erro': f"Formato desconhecido: {fmt}"}, status_code=400)
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_SIZE) as spool:
+        async for chunk in req.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        try:
+            imported, skipped = await run_in_db(import_file, spool, fmt)
+        except (ValueError, csv.Error) as e:
+            logging.warning("Importação interrompida por registro inválido: %s", e)
+            return JSONResponse({'erro': f"Registro inválido: {e}"}, status_code=400)
+        except sqlite3.Error as e:
+            logging.error("Erro de banco de dados na importação: %s", e)
+            return JSONResponse({'erro': "Erro ao gravar as entradas. Tente novamente!"}, status_code=500)
+    return {'importadas': imported, 'ignoradas': skipped}
+
+@rt('/export')
+async def get(format: str = 'ndjson', user_id: int = None):
+    fmt = format if format in FORMATS else 'ndjson'
+    sql, params = export_query(user_id)
+
+    async def chunks():
+        yield render_header(fmt)
+        async for rows in stream_rows(sql, params):
+            yield render_rows(rows, fmt)
+
+    media_type = 'text/csv; charset=utf-8' if fmt == 'csv' else 'application/x-ndjson'
+    return StreamingResponse(chunks(), media_type=media_type, headers={'Content-Disposition': f'attachment; filename="entradas.{fmt}"'})
+
 @rt('/del/{entry_id}')
-def delete_entry(entry_id: int):
+async def delete_entry(entry_id: int):
     try:
-        conn = sqlite3.connect('DATABASE.db')
-        cursor = conn.cursor()
-
-        cursor.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
-        conn.commit()
-
-        if cursor.rowcount > 0:
-            logging.info(f"Entrada {entry_id} excluído com sucesso!")
+        if await run_in_db(remove_entry, entry_id):
+            logging.info("Entrada %s excluído com sucesso!", entry_id)
             return Titled(
                 "ENTRADA APAGADA",
                 P(f"A entrada com ID {entry_id} foi apagada com sucesso."),
-                A("HOME", href='/', style='display: inline-block; padding: 10px 20px; margin: 10px; background-color: #007bff; color: white; text-align: center; text-decoration: none; border-radius: 5px; font-size: 16px; font-weight: bold; cursor: pointer; transition: background-color 0.3s ease;'),
-                A("ENTRADAS", href='/all_entries', style='display: inline-block; padding: 10px 20px; margin: 10px; background-color: #007bff; color: white; text-align: center; text-decoration: none; border-radius: 5px; font-size: 16px; font-weight: bold; cursor: pointer; transition: background-color 0.3s ease;')
+                A("HOME", href='/', cls='btn'),
+                A("ENTRADAS", href='/all_entries', cls='btn')
             )
         else:
-            logging.warning(f"Nenhuma entrada encontrada com ID: {entry_id}")
+            logging.warning("Nenhuma entrada encontrada com ID: %s", entry_id)
             return Titled(
                 "ERRO AO APAGAR",
                 P(f"Nenhuma entrada foi encontrada com ID {entry_id}."),
-                A("HOME", href='/', style='display: inline-block; padding: 10px 20px; margin: 10px; background-color: #007bff; color: white; text-align: center; text-decoration: none; border-radius: 5px; font-size: 16px; font-weight: bold; cursor: pointer; transition: background-color 0.3s ease;'),
-                A("ENTRADAS", href='/all_entries', style='display: inline-block; padding: 10px 20px; margin: 10px; background-color: #007bff; color: white; text-align: center; text-decoration: none; border-radius: 5px; font-size: 16px; font-weight: bold; cursor: pointer; transition: background-color 0.3s ease;')
+                A("HOME", href='/', cls='btn'),
+                A("ENTRADAS", href='/all_entries', cls='btn')
             )
     except sqlite3.Error as e:
-        logging.error(f"Erro de banco de dados ao excluir entrada: {entry_id}: {e}")
+        logging.error("Erro de banco de dados ao excluir entrada: %s: %s", entry_id, e)
         return Titled(
             "ERRO INTERNO",
             P("Houve um erro ao tentar apagar a entrada. Por favor, tente novamente mais tarde."),
-            A("HOME", href='/', style='display: inline-block; padding: 10px 20px; margin: 10px; background-color: #007bff; color: white; text-align: center; text-decoration: none; border-radius: 5px; font-size: 16px; font-weight: bold; cursor: pointer; transition: background-color 0.3s ease;'),
-            A("ENTRADAS", href='/all_entries', style='display: inline-block; padding: 10px 20px; margin: 10px; background-color: #007bff; color: white; text-align: center; text-decoration: none; border-radius: 5px; font-size: 16px; font-weight: bold; cursor: pointer; transition: background-color 0.3s ease;')
+            A("HOME", href='/', cls='btn'),
+            A("ENTRADAS", href='/all_entries', cls='btn')
         )
-    finally:
-        conn.close()
 
-def update_entry(entry_id, title, content, occupation, week_details, hobbies, hometown, weekend_plans):
+@rt('/del/{entry_id}')
+async def delete(entry_id: int):
+    # Usado pelo botão APAGAR dos cartões (hx-delete): em vez de uma página nova, a resposta só tira o cartão da lista.
     try:
-        conn = sqlite3.connect('DATABASE.db')
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE entries 
-            SET title = ?, content = ?, occupation = ?, week_details = ?, hobbies = ?, hometown = ?, weekend_plans = ?, timestamp = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (title, content, occupation, week_details, hobbies, hometown, weekend_plans, entry_id))
-        conn.commit()
-        if cursor.rowcount > 0:
-            logging.info(f"Publicação {entry_id} atualizada com sucesso")
-            return True
+        if await run_in_db(remove_entry, entry_id):
+            logging.info("Entrada %s excluído com sucesso!", entry_id)
         else:
-            logging.warning(f"Nenhuma publicação encontrada com o id {entry_id}")
-            return False
+            logging.warning("Nenhuma entrada encontrada com ID: %s", entry_id)
     except sqlite3.Error as e:
-        logging.error(f"Erro ao atualizar a publicação: {e}")
-        return False
-    finally:
-        conn.close()
+        logging.error("Erro de banco de dados ao excluir entrada: %s: %s", entry_id, e)
+        return Response("ERRO AO APAGAR A ENTRADA.", status_code=500)
+    return Div(id=f'entry-{entry_id}', hx_swap_oob='delete')
 
 serve()
\ No newline at end of file
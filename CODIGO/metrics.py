@@ -0,0 +1,241 @@
+import os
+import re
+import time
+import logging
+import threading
+import contextvars
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '100'))
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+logger = logging.getLogger(__name__)
+
+class Histogram:
+    """Histograma no formato do Prometheus (buckets cumulativos, soma e contagem) por combinação de rótulos."""
+
+    def __init__(self, name, help, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(data[0]), data[1], data[2]) for labels, data in self._series.items())
+        for label_values, counts, total, count in series:
+            labels = format_labels(self.labels, label_values)
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+class Counter:
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        lines += [f'{self.name}{{{format_labels(self.labels, labels)}}} {value}' for labels, value in values]
+        return lines
+
+def format_labels(names, values):
+    return ','.join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values))
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+REQUEST_SECONDS = Histogram('diario_http_request_duration_seconds', "Tempo total de resposta por rota.", ('method', 'route'))
+REQUEST_DB_SECONDS = Histogram('diario_http_request_db_seconds', "Tempo de cada requisição gasto esperando o banco.", ('method', 'route'))
+REQUEST_RENDER_SECONDS = Histogram('diario_http_request_render_seconds', "Tempo de cada requisição fora do banco (renderização e framework).", ('method', 'route'))
+REQUESTS = Counter('diario_http_requests_total', "Requisições atendidas por rota e status.", ('method', 'route', 'status'))
+QUERY_SECONDS = Histogram('diario_db_query_duration_seconds', "Tempo de cada consulta SQL, da execução à última linha lida.", ('query',))
+QUERY_ROWS = Counter('diario_db_query_rows_total', "Linhas lidas ou alteradas por consulta SQL.", ('query',))
+SLOW_QUERIES = Counter('diario_db_slow_queries_total', "Consultas acima do limite SLOW_QUERY_MS.", ('query',))
+METRICS = (REQUEST_SECONDS, REQUEST_DB_SECONDS, REQUEST_RENDER_SECONDS, REQUESTS, QUERY_SECONDS, QUERY_ROWS, SLOW_QUERIES)
+
+def render_metrics():
+    return '\n'.join(line for metric in METRICS for line in metric.render()) + '\n'
+
+class RequestTimer:
+    __slots__ = ('db_seconds',)
+
+    def __init__(self):
+        self.db_seconds = 0.0
+
+# O objeto é mutável de propósito: o contexto copiado para as threads do banco aponta para o mesmo timer.
+current_request = contextvars.ContextVar('current_request', default=None)
+
+def add_db_time(seconds):
+    timer = current_request.get()
+    if timer is not None:
+        timer.db_seconds += seconds
+
+class MetricsMiddleware:
+    """Middleware ASGI que mede cada requisição, do início até o último byte enviado."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        timer = RequestTimer()
+        token = current_request.set(timer)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            elapsed = time.perf_counter() - started
+            route = getattr(scope.get('route'), 'path', '<sem rota>')
+            method = scope['method']
+            REQUEST_SECONDS.observe(elapsed, method, route)
+            REQUEST_DB_SECONDS.observe(timer.db_seconds, method, route)
+            REQUEST_RENDER_SECONDS.observe(max(elapsed - timer.db_seconds, 0), method, route)
+            REQUESTS.inc(1, method, route, status)
+
+_whitespace = re.compile(r'\s+')
+_placeholder_list = re.compile(r'\?(?:\s*,\s*\?)+')
+_statement_names = {}
+
+def statement_name(sql):
+    # O rótulo é o próprio SQL compactado; listas de "?" viram "?, ..." para que um IN (...) de tamanho
+    # variável não crie um rótulo por tamanho.
+    name = _statement_names.get(sql)
+    if name is None:
+        name = _placeholder_list.sub('?, ...', _whitespace.sub(' ', sql).strip())
+        if len(_statement_names) < 1024:
+            _statement_names[sql] = name
+    return name
+
+class InstrumentedCursor:
+    """Mede cada consulta desde o execute até a leitura da última linha.
+
+    A medição é registrada quando o resultado termina (fetchall, fetch que
+    volta vazio), quando o cursor é reutilizado ou descartado; instruções sem
+    resultado (INSERT/UPDATE/DELETE sem RETURNING) são registradas no execute.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._sql = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def _start(self, sql):
+        self._finish()
+        self._sql = sql
+        self._elapsed = 0.0
+        self._rows = 0
+
+    def _finish(self):
+        if self._sql is None:
+            return
+        sql, self._sql = self._sql, None
+        rows = self._rows if self._cursor.description is not None else max(self._cursor.rowcount, 0)
+        record_query(sql, self._elapsed, rows)
+
+    def _timed(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._elapsed += time.perf_counter() - started
+
+    def execute(self, sql, params=()):
+        self._start(sql)
+        self._timed(self._cursor.execute, sql, params)
+        if self._cursor.description is None:
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._start(sql)
+        self._timed(self._cursor.executemany, sql, seq_of_params)
+        self._finish()
+        return self
+
+    def fetchone(self):
+        if self._sql is None:
+            return self._cursor.fetchone()
+        row = self._timed(self._cursor.fetchone)
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        if self._sql is None:
+            return self._cursor.fetchmany(size or self._cursor.arraysize)
+        rows = self._timed(self._cursor.fetchmany, size or self._cursor.arraysize)
+        self._rows += len(rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        if self._sql is None:
+            return self._cursor.fetchall()
+        rows = self._timed(self._cursor.fetchall)
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        self._cursor.close()
+
+    def __del__(self):
+        self._finish()
+
+def record_query(sql, seconds, rows):
+    name = statement_name(sql)
+    QUERY_SECONDS.observe(seconds, name)
+    QUERY_ROWS.inc(rows, name)
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        SLOW_QUERIES.inc(1, name)
+        logger.warning("Consulta lenta (%.1f ms, %d linhas): %s", seconds * 1000, rows, name)
@@ -0,0 +1,243 @@
+import logging
+
+from storage import BODY_FIELDS, pack, excerpt
+
+# A versão do esquema fica em PRAGMA user_version: a migração N leva o banco da versão N-1 para N.
+MIGRATIONS = []
+
+def migration(func):
+    MIGRATIONS.append(func)
+    return func
+
+@migration
+def create_tables(conn):
+    # IF NOT EXISTS permite adotar bancos criados antes do controle de versões.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT UNIQUE NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS entries (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            occupation TEXT,
+            week_details TEXT,
+            hobbies TEXT,
+            hometown TEXT,
+            weekend_plans TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+@migration
+def add_entry_listing_indexes(conn):
+    # get_entries filtra por user_id e ordena por timestamp; get_all_entries ordena todas as entradas por timestamp.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_user_timestamp ON entries (user_id, timestamp DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_timestamp ON entries (timestamp DESC)")
+
+@migration
+def add_keyset_indexes(conn):
+    # A paginação ordena por (timestamp DESC, id DESC). Índices ascendentes percorridos de trás para frente
+    # entregam o rowid também em ordem decrescente, sem o B-tree temporário que os índices DESC exigiam.
+    conn.execute("DROP INDEX IF EXISTS idx_entries_user_timestamp")
+    conn.execute("DROP INDEX IF EXISTS idx_entries_timestamp")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_user_keyset ON entries (user_id, timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_keyset ON entries (timestamp)")
+
+@migration
+def add_entries_search_index(conn):
+    # Índice FTS5 com conteúdo externo: o texto continua apenas em entries e os gatilhos mantêm o índice em dia.
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+            title, content, week_details, hobbies, hometown, weekend_plans,
+            content='entries', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS entries_fts_insert AFTER INSERT ON entries BEGIN
+            INSERT INTO entries_fts (rowid, title, content, week_details, hobbies, hometown, weekend_plans)
+            VALUES (new.id, new.title, new.content, new.week_details, new.hobbies, new.hometown, new.weekend_plans);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS entries_fts_delete AFTER DELETE ON entries BEGIN
+            INSERT INTO entries_fts (entries_fts, rowid, title, content, week_details, hobbies, hometown, weekend_plans)
+            VALUES ('delete', old.id, old.title, old.content, old.week_details, old.hobbies, old.hometown, old.weekend_plans);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS entries_fts_update
+        AFTER UPDATE OF title, content, week_details, hobbies, hometown, weekend_plans ON entries BEGIN
+            INSERT INTO entries_fts (entries_fts, rowid, title, content, week_details, hobbies, hometown, weekend_plans)
+            VALUES ('delete', old.id, old.title, old.content, old.week_details, old.hobbies, old.hometown, old.weekend_plans);
+            INSERT INTO entries_fts (rowid, title, content, week_details, hobbies, hometown, weekend_plans)
+            VALUES (new.id, new.title, new.content, new.week_details, new.hobbies, new.hometown, new.weekend_plans);
+        END
+    """)
+    conn.execute("INSERT INTO entries_fts (entries_fts) VALUES ('rebuild')")
+
+@migration
+def split_entry_bodies(conn):
+    # As listagens só leem entries, agora estreita (título, resumo, ocupação, cidade, data); os textos longos vão
+    # para entry_bodies, comprimidos quando compensa. A view entries_full junta as duas tabelas com o texto já
+    # descomprimido (função body_text) e serve de conteúdo externo para o índice de pesquisa.
+    conn.create_function('pack_body', 1, pack)
+    conn.create_function('entry_excerpt', 1, excerpt)
+    for trigger in ('entries_fts_insert', 'entries_fts_delete', 'entries_fts_update'):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("DROP TABLE IF EXISTS entries_fts")
+
+    # Colunas sem tipo declarado: cada valor fica como TEXT ou, se comprimido, BLOB.
+    conn.execute(f"""
+        CREATE TABLE entry_bodies (
+            entry_id INTEGER PRIMARY KEY REFERENCES entries (id),
+            {', '.join(BODY_FIELDS)}
+        )
+    """)
+    conn.execute(f"""
+        INSERT INTO entry_bodies (entry_id, {', '.join(BODY_FIELDS)})
+        SELECT id, {', '.join(f'pack_body({field})' for field in BODY_FIELDS)} FROM entries
+    """)
+    conn.execute("""
+        CREATE TABLE entries_new (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            title TEXT NOT NULL,
+            excerpt TEXT NOT NULL DEFAULT '',
+            occupation TEXT,
+            hometown TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    """)
+    conn.execute("""
+        INSERT INTO entries_new (id, user_id, title, excerpt, occupation, hometown, timestamp)
+        SELECT id, user_id, title, entry_excerpt(content), occupation, hometown, timestamp FROM entries
+    """)
+    conn.execute("DROP TABLE entries")
+    conn.execute("ALTER TABLE entries_new RENAME TO entries")
+    conn.execute("CREATE INDEX idx_entries_user_keyset ON entries (user_id, timestamp)")
+    conn.execute("CREATE INDEX idx_entries_keyset ON entries (timestamp)")
+
+    conn.execute("""
+        CREATE VIEW entries_full AS
+        SELECT e.id, e.user_id, e.title, body_text(b.content) AS content, e.occupation,
+               body_text(b.week_details) AS week_details, body_text(b.hobbies) AS hobbies, e.hometown,
+               body_text(b.weekend_plans) AS weekend_plans, e.timestamp, e.excerpt
+        FROM entries e
+        JOIN entry_bodies b ON b.entry_id = e.id
+    """)
+    conn.execute("""
+        CREATE VIRTUAL TABLE entries_fts USING fts5(
+            title, content, week_details, hobbies, hometown, weekend_plans,
+            content='entries_full', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    # O índice acompanha as linhas de entry_bodies: toda entrada tem a sua, gravada junto com ela.
+    conn.execute("""
+        CREATE TRIGGER entries_delete_body BEFORE DELETE ON entries BEGIN
+            DELETE FROM entry_bodies WHERE entry_id = old.id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER entry_bodies_fts_insert AFTER INSERT ON entry_bodies BEGIN
+            INSERT INTO entries_fts (rowid, title, content, week_details, hobbies, hometown, weekend_plans)
+            SELECT id, title, content, week_details, hobbies, hometown, weekend_plans FROM entries_full WHERE id = new.entry_id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER entry_bodies_fts_delete AFTER DELETE ON entry_bodies BEGIN
+            INSERT INTO entries_fts (entries_fts, rowid, title, content, week_details, hobbies, hometown, weekend_plans)
+            SELECT 'delete', old.entry_id, e.title, body_text(old.content), body_text(old.week_details),
+                   body_text(old.hobbies), e.hometown, body_text(old.weekend_plans)
+            FROM entries e WHERE e.id = old.entry_id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER entry_bodies_fts_update AFTER UPDATE ON entry_bodies BEGIN
+            INSERT INTO entries_fts (entries_fts, rowid, title, content, week_details, hobbies, hometown, weekend_plans)
+            SELECT 'delete', old.entry_id, e.title, body_text(old.content), body_text(old.week_details),
+                   body_text(old.hobbies), e.hometown, body_text(old.weekend_plans)
+            FROM entries e WHERE e.id = old.entry_id;
+            INSERT INTO entries_fts (rowid, title, content, week_details, hobbies, hometown, weekend_plans)
+            SELECT id, title, content, week_details, hobbies, hometown, weekend_plans FROM entries_full WHERE id = new.entry_id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER entries_fts_update AFTER UPDATE OF title, hometown ON entries BEGIN
+            INSERT INTO entries_fts (entries_fts, rowid, title, content, week_details, hobbies, hometown, weekend_plans)
+            SELECT 'delete', old.id, old.title, content, week_details, hobbies, old.hometown, weekend_plans
+            FROM entries_full WHERE id = old.id;
+            INSERT INTO entries_fts (rowid, title, content, week_details, hobbies, hometown, weekend_plans)
+            SELECT id, title, content, week_details, hobbies, hometown, weekend_plans FROM entries_full WHERE id = new.id;
+        END
+    """)
+    conn.execute("INSERT INTO entries_fts (entries_fts) VALUES ('rebuild')")
+
+@migration
+def store_search_text(conn):
+    # Os gatilhos da migração anterior liam entries_full e, portanto, body_text: fora da aplicação até um DELETE
+    # falhava com "no such function". O índice passa a guardar o próprio texto (tabela FTS5 comum) e os gatilhos
+    # usam só colunas; o texto das histórias é gravado pela aplicação, que já o tem descomprimido. A cópia inicial
+    # ainda lê entries_full, com o body_text da conexão que migra.
+    for trigger in ('entry_bodies_fts_insert', 'entry_bodies_fts_delete', 'entry_bodies_fts_update', 'entries_fts_update'):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("DROP TABLE IF EXISTS entries_fts")
+    conn.execute("""
+        CREATE VIRTUAL TABLE entries_fts USING fts5(
+            title, content, week_details, hobbies, hometown, weekend_plans,
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    conn.execute("""
+        INSERT INTO entries_fts (rowid, title, content, week_details, hobbies, hometown, weekend_plans)
+        SELECT id, title, content, week_details, hobbies, hometown, weekend_plans FROM entries_full
+    """)
+    conn.execute("""
+        CREATE TRIGGER entries_fts_delete AFTER DELETE ON entries BEGIN
+            DELETE FROM entries_fts WHERE rowid = old.id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER entries_fts_update AFTER UPDATE OF title, hometown ON entries BEGIN
+            UPDATE entries_fts SET title = new.title, hometown = new.hometown WHERE rowid = new.id;
+        END
+    """)
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    """Aplica as migrações pendentes e devolve quantas foram aplicadas.
+
+    A versão é relida dentro de uma transação BEGIN IMMEDIATE, então vários
+    processos iniciando ao mesmo tempo não aplicam a mesma migração duas vezes.
+    Com o esquema em dia, a verificação é só uma leitura e não disputa o
+    bloqueio de escrita.
+    """
+    if schema_version(conn) >= len(MIGRATIONS):
+        return 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = schema_version(conn)
+        for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+            logging.info("Migração %s aplicada: %s", number, step.__name__)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return len(MIGRATIONS) - version
+
+if __name__ == '__main__':
+    from database import connection, DATABASE_PATH
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    with connection() as conn:
+        migrate(conn)
+        logging.info("%s está na versão %s do esquema", DATABASE_PATH, schema_version(conn))
@@ -0,0 +1,75 @@
+from html import escape
+from fasthtml.common import *
+
+# Estilos compartilhados: substituem o mesmo style="..." que se repetia em cada botão de cada linha.
+STYLESHEET = """
+.btn { display: inline-block; padding: 10px 20px; margin: 10px; background-color: #007bff; color: white; text-align: center; text-decoration: none; border-radius: 5px; font-size: 16px; font-weight: bold; cursor: pointer; transition: background-color 0.3s ease; }
+.btn-inline { margin: 10px 0; }
+.btn-square { border-radius: 0; }
+.btn-danger { background-color: #dc3545; }
+.btn-red { background-color: red; }
+.entry-actions { display: flex; justify-content: start; gap: 10px; margin-top: 10px; }
+.field { margin-bottom: 10px; }
+.field-label { font-weight: bold; display: inline-block; width: 150px; }
+""".strip()
+
+class Template:
+    """Fragmento FT serializado uma única vez em uma string de formatação.
+
+    Os campos `{nome}` escritos no componente viram parâmetros; na chamada cada
+    valor é escapado (exceto `NotStr`, que já é HTML) e `None` vira texto vazio.
+    Renderizar uma linha passa a custar um `str.format` em vez de montar e
+    serializar uma árvore de componentes.
+    """
+
+    def __init__(self, component):
+        self.source = to_xml(component, indent=False)
+        self._format = self.source.format
+
+    def __call__(self, **fields):
+        return self._format(**{name: value_html(value) for name, value in fields.items()})
+
+def value_html(value):
+    if value is None:
+        return ''
+    if isinstance(value, NotStr):
+        return str(value)
+    return escape(str(value))
+
+# Nas listas só o resumo da história; o texto completo e os demais campos longos ficam para /view_entry.
+ENTRY_CARD = Template(Div(
+    H3("{title}"),
+    P("ESTÓRIA: {excerpt}"),
+    P("OCUPAÇÃO: {occupation}"),
+    P("CIDADE NATAL: {hometown}"),
+    P("POSTADO EM: {timestamp}"),
+    Div(
+        A("VER", href='/view_entry/{entry_id}', cls='btn'),
+        A("EDITAR", href='/edit/{entry_id}', cls='btn'),
+        A("APAGAR", href='/del/{entry_id}', hx_delete='/del/{entry_id}', hx_swap='none', cls='btn btn-danger'),
+        cls='entry-actions'
+    ),
+    id='entry-{entry_id}'
+))
+
+ENTRY_LINK = Template(Div(
+    A("{title} COM USUÁRIO: {username}", href='/view_entry/{entry_id}', cls='btn btn-red')
+))
+
+ENTRY_FIELD = Template(Div(
+    Div("{label}", cls='field-label'),
+    " -> ",
+    "{value}",
+    cls='field'
+))
+
+ENTRY_DETAIL_ACTIONS = Template((
+    A("EDITAR", href='/edit/{entry_id}', cls='btn'),
+    A("APAGAR", href='/del/{entry_id}', cls='btn')
+))
+
+SEARCH_RESULT = Template(Div(
+    A("{title} COM USUÁRIO: {username}", href='/view_entry/{entry_id}', cls='btn btn-red'),
+    P("{excerpt} ({timestamp})"),
+    id='result-{entry_id}'
+))
@@ -0,0 +1,44 @@
+import re
+import logging
+from html import escape
+
+# Marcadores de controle usados por highlight()/snippet(); o texto é escapado antes de virarem <mark>.
+MARK_START = '\x02'
+MARK_END = '\x03'
+# Colunas de entries_fts, que guarda o próprio texto: a aplicação grava as histórias já descomprimidas.
+SEARCH_FIELDS = ('title', 'content', 'week_details', 'hobbies', 'hometown', 'weekend_plans')
+
+def match_query(text):
+    """Converte o texto digitado em uma consulta FTS5 segura.
+
+    Cada palavra vira uma frase entre aspas (aspas internas são duplicadas),
+    então operadores e parênteses digitados pelo usuário não geram erro de
+    sintaxe. A última palavra aceita prefixo para a busca funcionar enquanto se
+    digita.
+    """
+    terms = re.findall(r'\w+', text or '')
+    if not terms:
+        return None
+    phrases = ['"' + term.replace('"', '""') + '"' for term in terms]
+    phrases[-1] += '*'
+    return ' '.join(phrases)
+
+def highlighted(text):
+    return escape(text or '').replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+def rebuild_index(conn):
+    # Relê o texto de entries_full (body_text), então corrige também entradas gravadas fora da aplicação.
+    columns = ', '.join(SEARCH_FIELDS)
+    with conn:
+        conn.execute("DELETE FROM entries_fts")
+        conn.execute(f"INSERT INTO entries_fts (rowid, {columns}) SELECT id, {columns} FROM entries_full")
+        conn.execute("INSERT INTO entries_fts (entries_fts) VALUES ('optimize')")
+
+if __name__ == '__main__':
+    from database import connection, DATABASE_PATH
+    from migrations import migrate
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    with connection() as conn:
+        migrate(conn)
+        rebuild_index(conn)
+    logging.info("Índice de pesquisa de %s reconstruído", DATABASE_PATH)
@@ -0,0 +1,52 @@
+"""Ponto de entrada de produção com vários processos.
+
+Uso, dentro do diretório ./CODIGO:
+
+    python server.py --workers 4 --port 5001
+
+As migrações rodam uma única vez, aqui, antes de o uvicorn iniciar os
+workers. Cada worker é um processo novo (spawn) que importa `main`, abre as
+próprias conexões e, ao subir, só confere a versão do esquema. Com mais de um
+worker o cache de páginas de cada processo passa a conferir o banco a cada
+CACHE_SYNC_INTERVAL segundos, para não servir páginas que outro worker já
+alterou.
+"""
+import os
+import logging
+import argparse
+
+import uvicorn
+
+from database import connection, close_pool, DATABASE_PATH
+from migrations import migrate, schema_version
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SYNC_INTERVAL = '0.1'
+
+def prepare_database():
+    with connection() as conn:
+        applied = migrate(conn)
+        logging.info("%s na versão %s do esquema (%s migrações aplicadas)", DATABASE_PATH, schema_version(conn), applied)
+    # Nenhuma conexão aberta aqui deve sobreviver nos workers.
+    close_pool()
+
+def main():
+    parser = argparse.ArgumentParser(description="Sobe o diário com vários workers do uvicorn.")
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', '5001')))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', str(os.cpu_count() or 1))))
+    parser.add_argument('--log-level', default=os.environ.get('LOG_LEVEL', 'INFO').lower())
+    parser.add_argument('--no-access-log', action='store_true')
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format='%(asctime)s - %(levelname)s - %(message)s')
+
+    prepare_database()
+    if args.workers > 1:
+        # Os workers herdam o ambiente deste processo.
+        os.environ.setdefault('CACHE_SYNC_INTERVAL', DEFAULT_SYNC_INTERVAL)
+    logging.info("Iniciando %s workers em %s:%s", args.workers, args.host, args.port)
+    uvicorn.run('main:app', host=args.host, port=args.port, workers=args.workers, app_dir=APP_DIR,
+                log_level=args.log_level, access_log=not args.no_access_log)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Armazenamento dos textos longos das entradas.
+
+`entries` guarda só o que as listagens mostram (título, resumo, ocupação,
+cidade, data); os campos longos ficam em `entry_bodies`, uma linha por
+entrada, e só são lidos por /view_entry, /edit, pela pesquisa e pela
+exportação. Textos a partir de DATABASE_COMPRESS_MIN_BYTES bytes são gravados
+comprimidos com zlib (como BLOB); os menores continuam como TEXT. A função SQL
+`body_text`, registrada nas conexões de leitura, devolve sempre o texto; o
+índice de pesquisa guarda a sua própria cópia, sem compressão, e nenhum
+gatilho usa a função.
+"""
+import os
+import re
+import zlib
+
+BODY_FIELDS = ('content', 'week_details', 'hobbies', 'weekend_plans')
+COMPRESS_BODIES = os.environ.get('DATABASE_COMPRESS_BODIES', '1') == '1'
+COMPRESS_MIN_BYTES = int(os.environ.get('DATABASE_COMPRESS_MIN_BYTES', '256'))
+COMPRESS_LEVEL = 6
+EXCERPT_CHARS = 200
+
+_whitespace = re.compile(r'\s+')
+
+def pack(text):
+    if not isinstance(text, str) or not COMPRESS_BODIES:
+        return text
+    data = text.encode('utf-8')
+    if len(data) < COMPRESS_MIN_BYTES:
+        return text
+    packed = zlib.compress(data, COMPRESS_LEVEL)
+    # Texto que não diminui fica como está.
+    return packed if len(packed) < len(data) else text
+
+def unpack(value):
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode('utf-8')
+    return value
+
+def excerpt(text, size=EXCERPT_CHARS):
+    # Resumo pré-calculado na escrita: as listagens não precisam ler nem descomprimir o texto completo.
+    text = _whitespace.sub(' ', '' if text is None else str(text)).strip()
+    if len(text) <= size:
+        return text
+    cut = text.rfind(' ', 0, size)
+    return text[:cut if cut > size // 2 else size].rstrip(' ,.;:') + '…'
+
+def register_functions(conn):
+    conn.create_function('body_text', 1, unpack, deterministic=True)
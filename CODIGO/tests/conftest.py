@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os módulos da aplicação são importados pelo nome, como quando rodam de dentro de ./CODIGO.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
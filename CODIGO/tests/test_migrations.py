@@ -0,0 +1,116 @@
+"""Migrações aplicadas sobre um DATABASE.db criado pela versão original do diário.
+
+Uso, dentro do diretório ./CODIGO:
+
+    python -m pytest tests
+"""
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+import main
+import database
+from migrations import MIGRATIONS, migrate, schema_version
+
+# Esquema criado pelo setup_db original, antes do controle de versões.
+BASELINE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        username TEXT UNIQUE NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS entries (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        title TEXT NOT NULL,
+        content TEXT NOT NULL,
+        occupation TEXT,
+        week_details TEXT,
+        hobbies TEXT,
+        hometown TEXT,
+        weekend_plans TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    );
+"""
+USERS = 3
+ENTRIES = 120
+
+class RecordingConnection:
+    """Repassa as consultas para a conexão real e guarda cada (sql, params)."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.statements = []
+
+    def execute(self, sql, params=()):
+        self.statements.append((sql, params))
+        return self.conn.execute(sql, params)
+
+@pytest.fixture
+def conn(tmp_path):
+    path = str(tmp_path / 'DATABASE.db')
+    baseline = sqlite3.connect(path)
+    baseline.executescript(BASELINE_SCHEMA)
+    baseline.executemany("INSERT INTO users (username) VALUES (?)", [(f"usuario{i}",) for i in range(USERS)])
+    baseline.executemany("""
+        INSERT INTO entries (user_id, title, content, occupation, week_details, hobbies, hometown, weekend_plans, timestamp)
+        VALUES (?, ?, ?, 'dev', 'semana', 'xadrez', 'Recife', 'praia', ?)
+    """, [(i % USERS + 1, f"Entrada {i}", "história " * (i % 80 + 1), f"2024-01-01 00:{i // 60:02d}:{i % 60:02d}")
+          for i in range(ENTRIES)])
+    baseline.commit()
+    baseline.close()
+
+    conn = database.connect(path)
+    migrate(conn)
+    yield conn
+    conn.close()
+
+@pytest.fixture
+def recorder(conn, monkeypatch):
+    recording = RecordingConnection(conn)
+
+    @contextmanager
+    def connection():
+        yield recording
+
+    monkeypatch.setattr(main, 'connection', connection)
+    return recording
+
+def query_plan(conn, sql, params):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+def test_reaches_final_schema_version(conn):
+    assert schema_version(conn) == len(MIGRATIONS)
+    assert migrate(conn) == 0
+
+def test_keeps_existing_entries(conn):
+    assert conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == ENTRIES
+    content, hobbies = conn.execute("SELECT content, hobbies FROM entries_full WHERE id = 80").fetchone()
+    assert content == "história " * 80
+    assert hobbies == 'xadrez'
+
+@pytest.mark.parametrize('listing, index', [
+    (lambda cursor: main.get_entries(1, cursor, limit=10), 'idx_entries_user_keyset'),
+    (lambda cursor: main.get_all_entries(cursor, limit=10), 'idx_entries_keyset'),
+])
+def test_listings_use_keyset_indexes(conn, recorder, listing, index):
+    entries, next_cursor = listing(None)
+    assert len(entries) == 10 and next_cursor
+    listing(main.decode_cursor(next_cursor))
+
+    assert len(recorder.statements) == 2
+    for sql, params in recorder.statements:
+        plan = query_plan(conn, sql, params)
+        assert any(index in step for step in plan), plan
+        assert not any('USE TEMP B-TREE' in step for step in plan), plan
+
+def test_plain_client_can_write_without_app_functions(conn, tmp_path):
+    plain = sqlite3.connect(str(tmp_path / 'DATABASE.db'))
+    with plain:
+        plain.execute("DELETE FROM entries WHERE id = 5")
+        plain.execute("UPDATE entries SET title = 'Renomeada' WHERE id = 6")
+    assert plain.execute("SELECT COUNT(*) FROM entry_bodies WHERE entry_id = 5").fetchone()[0] == 0
+    assert plain.execute("SELECT rowid FROM entries_fts WHERE entries_fts MATCH 'renomeada'").fetchall() == [(6,)]
+    assert plain.execute("SELECT COUNT(*) FROM entries_fts").fetchone()[0] == ENTRIES - 1
+    plain.close()
@@ -0,0 +1,63 @@
+"""Escritor agrupado (GroupCommitWriter): uma escrita inválida não pode derrubar a thread nem as outras escritas."""
+import threading
+
+import pytest
+
+import database
+
+TIMEOUT = 5
+
+def run(target, *args):
+    # Threads daemon: se o escritor morrer, submit espera para sempre e o teste falha por tempo em vez de travar.
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+def submit(writer, statements):
+    outcome = []
+    run(lambda: outcome.append(capture(writer.submit, statements))).join(timeout=TIMEOUT)
+    assert outcome, "o escritor não respondeu"
+    result, error = outcome[0]
+    if error is not None:
+        raise error
+    return result
+
+def capture(func, *args):
+    try:
+        return func(*args), None
+    except Exception as e:
+        return None, e
+
+@pytest.fixture
+def writer(tmp_path):
+    path = str(tmp_path / 'DATABASE.db')
+    conn = database.connect(path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL)")
+    conn.commit()
+    conn.close()
+    # Janela longa o bastante para as escritas das threads caírem no mesmo lote.
+    writer = database.GroupCommitWriter(path, window_ms=50)
+    yield writer
+    writer.close()
+
+def test_survives_bad_bind(writer):
+    with pytest.raises(OverflowError):
+        submit(writer, [("INSERT INTO items (id, name) VALUES (?, ?)", (10 ** 30, 'grande'))])
+    assert writer._thread.is_alive()
+    assert submit(writer, [("INSERT INTO items (name) VALUES (?)", ('depois',))])[0].lastrowid == 1
+
+def test_batch_keeps_results_per_caller(writer):
+    results = {}
+
+    def insert(name, params):
+        result, error = capture(writer.submit, [("INSERT INTO items (id, name) VALUES (?, ?)", params)])
+        results[name] = type(error) if error else result[0].lastrowid
+
+    threads = [run(insert, f'item{i}', (i + 1, f'item{i}')) for i in range(5)]
+    threads += [run(insert, 'ruim', (10 ** 30, 'ruim')), run(insert, 'nulo', (100, None))]
+    for thread in threads:
+        thread.join(timeout=TIMEOUT)
+
+    assert results == {**{f'item{i}': i + 1 for i in range(5)}, 'ruim': OverflowError, 'nulo': database.sqlite3.IntegrityError}
+    assert writer._thread.is_alive()
+    assert submit(writer, [("SELECT COUNT(*) FROM items", ())])[0].rows == [(5,)]